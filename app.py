@@ -1,20 +1,23 @@
 import streamlit as st
 import pandas as pd
 
-from google.oauth2 import service_account
-import gspread
 import os
+from types import MappingProxyType
 import base64
 import numpy as np
 
-from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
-from st_aggrid.grid_options_builder import GridOptionsBuilder
 import random
 import sqlite3
 
-import plotly.colors as pc
-import plotly.express as px
-import plotly.graph_objects as go
+# gspread, google.oauth2, st_aggrid and plotly are imported where they are first
+# used, so a cold process renders the login form without loading them
+import caching
+import historical
+import perf
+import portfolio
+import presets
+import schema
+import sources
 
 
 tab_descriptions = {
@@ -40,25 +43,188 @@ tab_descriptions = {
 }
 
 
-@st.cache_data
-def load_historical_data():
-    """Load and cache historical data from SQLite database"""
+def get_setting(name, default=None):
+    """Read a setting from the environment (MINDSEEKER_<NAME>) or from st.secrets"""
+    env_value = os.environ.get(f"MINDSEEKER_{name.upper()}")
+    if env_value is not None:
+        return env_value
     try:
-        # Connect to SQLite database
-        conn = sqlite3.connect('mtg_historical.db')
-        
-        # Read data into DataFrame
-        query = "SELECT * FROM mtg_card_prices_historical ORDER BY date, card_name_set"  # Adjust table name if different
-        df_historical = pd.read_sql_query(query, conn)
-        
-        # Close connection
-        conn.close() 
-        return df_historical
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        # No secrets file at all
+        return default
+
+
+def setting_enabled(name):
+    """Boolean settings accept true/1/yes (case insensitive) or a real bool"""
+    return str(get_setting(name, False)).strip().lower() in ('true', '1', 'yes')
+
+
+@st.cache_resource
+def prepare_historical_db():
+    """Make sure the historical database has its lookup indexes and current tier columns (once per process)"""
+    try:
+        conn = historical.connect()
+        historical.ensure_indexes(conn)
+        historical.upgrade_tier_tables(conn)
+        conn.close()
+    except sqlite3.Error:
+        # Read-only or missing database: queries still work, just without the index
+        pass
+
+
+@st.cache_resource
+def get_shared_cache():
+    """
+    Disk tier shared by every Streamlit worker of the host, in the "shared_cache_dir"
+    setting (disabled when unset): each user's frame and each history range is then
+    loaded once per host instead of once per worker.
+    """
+    directory = get_setting("shared_cache_dir", None)
+    return caching.DiskTier(directory) if directory else None
+
+
+def query_history(start_date):
+    prepare_historical_db()
+    # Connect to SQLite database
+    conn = historical.connect()
+    
+    # Read data into DataFrame
+    with perf.stage('load_historical_data.query'):
+        df_historical = historical.load_history(conn, start_date)
+    
+    # Close connection
+    conn.close() 
+    return df_historical
+
+
+def read_history_index(start_date, watermark):
+    """Historical prices from start_date, indexed by card as read-only SharedFrames"""
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        df_historical = query_history(start_date)
+    else:
+        # The watermark is part of the key: new prices make every worker query again
+        with perf.stage('load_historical_data.shared'):
+            df_historical = shared_cache.get_or_load(
+                ('history', start_date, watermark), lambda: query_history(start_date)
+            ).value
+    with perf.stage('load_historical_data.index'):
+        history_by_card = historical.index_by_card(df_historical)
+        return MappingProxyType({card: caching.SharedFrame(frame) for card, frame in history_by_card.items()})
+
+
+@st.cache_resource(max_entries=8)
+def load_historical_data(start_date=None, watermark=None):
+    """
+    Load and cache historical data from SQLite database.
+    The date range is pushed down into the query, dates come back already parsed
+    and the result is indexed by card_name_set so selecting a card is a dict lookup.
+    Cached as a resource: every rerun and session reads the same read-only
+    caching.SharedFrame handles instead of unpickling a copy of the history.
+    Streamlit computes each key once per process, concurrent callers of the
+    same key wait for that computation, so identical cold loads query once.
+    """
+    try:
+        return read_history_index(start_date, watermark)
     except Exception as e:
         st.error(f"Error loading historical data: {str(e)}")
-        return pd.DataFrame()  # Return empty DataFrame if there's an error
+        return MappingProxyType({})  # Return empty index if there's an error
+
+
+@st.cache_data(show_spinner=False)
+def load_latest_history_date(watermark):
+    """Load and cache the most recent date in the historical database"""
+    try:
+        prepare_historical_db()
+        conn = historical.connect()
+        latest_date = historical.latest_history_date(conn)
+        conn.close()
+        return latest_date
+    except Exception:
+        return None
+
+
+@st.cache_data(show_spinner=False)
+def load_portfolio_value_history(_holdings, data_version, start_date, watermark):
+    """
+    Load and cache the portfolio value over time.
+    The cache is keyed by the user data version and the history watermark,
+    so _holdings itself is not hashed on every rerun.
+    """
+    try:
+        prepare_historical_db()
+        conn = historical.connect()
+        df_value = historical.portfolio_value_history(conn, _holdings, start_date)
+        conn.close()
+        return df_value
+    except Exception as e:
+        st.error(f"Error loading portfolio history: {str(e)}")
+        return pd.DataFrame()
+
+
+@st.cache_data(show_spinner=False)
+def load_cards_history(cards, start_date, watermark):
+    """Load and cache the price history of several cards with one batched query"""
+    try:
+        prepare_historical_db()
+        conn = historical.connect()
+        df_cards = historical.card_price_history(conn, cards, start_date)
+        conn.close()
+        return df_cards
+    except Exception as e:
+        st.error(f"Error loading card history: {str(e)}")
+        return pd.DataFrame()
 
 
+def show_plotly_chart(name, fig, **kwargs):
+    """st.plotly_chart, timed and with its payload size recorded when profiling is on"""
+    if not perf.is_enabled():
+        return st.plotly_chart(fig, **kwargs)
+    perf.record_payload(f"plotly.{name}", fig.to_json)
+    with perf.stage(f"plotly.{name}"):
+        return st.plotly_chart(fig, **kwargs)
+
+
+def show_aggrid(name, df_grid, **kwargs):
+    """AgGrid, timed and with its payload size recorded when profiling is on"""
+    from st_aggrid import AgGrid
+
+    if not perf.is_enabled():
+        return AgGrid(df_grid, **kwargs)
+    perf.record_payload(f"aggrid.{name}", lambda: df_grid.to_json(orient='records'))
+    with perf.stage(f"aggrid.{name}"):
+        return AgGrid(df_grid, **kwargs)
+
+
+def get_portfolio_holdings(df):
+    """Return the amount held per card_name_set and a version hash of those holdings"""
+    holdings = df.groupby('card_name_set')['amount'].sum().fillna(0)
+    data_version = int(pd.util.hash_pandas_object(holdings).sum())
+    return holdings, data_version
+
+
+# Date range options for Historical Trends (days back from the latest price date)
+HISTORY_DATE_RANGES = {
+    "7d": 7,
+    "30d": 30,
+    "90d": 90,
+    "1y": 365,
+    "All": None
+}
+
+# Point budget per historical line, roughly one point per pixel of chart width
+# (phone / laptop / wide screen); "Full" ships every daily point
+HISTORY_CHART_DETAIL = {
+    "Low": 300,
+    "Medium": 800,
+    "High": 1600,
+    "Full": None
+}
+
+# Above this many points, comparison charts are drawn with WebGL (Scattergl) traces
+WEBGL_POINT_THRESHOLD = 5000
+
 # Add this near the top of your file with other constants
 TRIVIAS = [
     "Your journey to mastering your inventory begins here!",
@@ -81,6 +247,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Hot-path instrumentation (off unless the "profiling" setting is enabled)
+perf.configure(setting_enabled("profiling"))
+perf.start_run()
+
 # Load app logo for sidebar
 assets_path = os.path.join(os.path.dirname(__file__), 'assets')
 app_logo_path = os.path.join(assets_path, 'app_logo.png')
@@ -666,68 +836,16 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Column name mappings and categories (add this after the imports)
-COLUMN_NAMES = {
-    'amount': 'Amount',
-    'card_name': 'Card Name',
-    'card_set': 'Set',
-    'language': 'Language',
-    'condition': 'Condition',
-    'foil': 'Foil',
-    'signed': 'Signed',
-    'country': 'Country',
-    'purchase_price': 'Purchase Price',
-    'from_price': 'From Price',
-    'trend_price': 'Trend Price',  # Removed "in €"
-    'ms_trend_price': 'MS Trend Price',  # Removed "in €"
-    'efficient_price': 'Efficient Price',  # Removed "in €"
-    'conservative_price': 'Conservative Price',  # Removed "in €"
-    'value_price': 'Value Price',  # Removed "in €"
-    'alerts': 'Alerts',
-    'notes': 'Notes',
-    'date': 'Date',
-    'last_sold_date': 'Last Sold Date',
-    'liquidity': 'Liquidity',
-    'listed_price': 'Cardmarket Listed Price',  # Removed "in €"
-    'listed_stock': 'Cardmarket Listed Stock',
-    'total_stock': 'Total Stock',
-    'country_stock': 'Country Stock',
-    'price_growth': 'Purchase Price Change %',
-    'equity_in_country': 'Equity in Country',
-    'equity_on_cardmarket': 'Equity on Cardmarket',
-    'total_efficient_value': 'Total Value',  # Removed "in €"
-    'total_conservative_value': 'Conservative Value',  # Removed "in €"
-    'collection_number': 'Collection Number',
-    'rarity': 'Rarity',
-    'reserved_list': 'Reserved List',
-    'set_release_date': 'Set Release Date',
-    'frame_era': 'Frame Era',
-    'set_type': 'Set Type',
-    'price_diff_d7': 'Today vs D7',
-    'purchase_price_diff': 'Purchase Price Change'
-}
+# Column display names, selector categories and defaults, from the column schema
+COLUMN_NAMES = schema.display_names()
 
 # Default columns
-DEFAULT_COLUMNS = [
-    'amount', 'card_name', 'card_set', 'language', 'condition', 
-    'foil', 'signed', 'alerts', 'price_diff_d7', 'liquidity', 'last_sold_date', 'from_price', 'trend_price',
-    'ms_trend_price', 'efficient_price', 'conservative_price', 'value_price'
-]
+DEFAULT_COLUMNS = schema.default_columns()
 
 # Column categories for the selector
 column_categories = {
-    "Dimensions": [
-        'amount', 'card_name', 'card_set', 'language', 'condition', 
-        'foil', 'signed', 'country', 'liquidity', 'last_sold_date', 'alerts', 'notes', 
-        'collection_number', 'rarity', 'reserved_list', 'set_release_date', 'frame_era', 'set_type'
-    ],
-    "Metrics": [
-        'from_price', 'trend_price', 'ms_trend_price', 'efficient_price', 
-        'conservative_price', 'value_price', 'total_stock', 'country_stock', 
-        'equity_in_country', 'equity_on_cardmarket', 'listed_price',
-        'listed_stock', 'total_efficient_value', 'total_conservative_value', 'price_diff_d7',
-        'purchase_price', 'purchase_price_diff', 'price_growth'
-    ]
+    "Dimensions": schema.columns_in("Dimensions"),
+    "Metrics": schema.columns_in("Metrics")
 }
 
 
@@ -735,6 +853,8 @@ column_categories = {
 # Authentication
 @st.cache_resource
 def get_credentials():
+    from google.oauth2 import service_account
+
     credentials = service_account.Credentials.from_service_account_info(
         st.secrets["gcp_service_account"],
         scopes=[
@@ -744,58 +864,6 @@ def get_credentials():
     )
     return credentials
 
-def get_user_sheet_id(username):
-    """Get the sheet ID for a specific user from the setup sheet"""
-    credentials = get_credentials()
-    gc = gspread.authorize(credentials)
-    
-    # Get setup sheet ID from secrets
-    setup_sheet_id = st.secrets["sheets_setup_id"]
-    setup_sheet = gc.open_by_key(setup_sheet_id)
-    setup_worksheet = setup_sheet.get_worksheet(0)
-    
-    # Get data and convert to DataFrame
-    data = setup_worksheet.get_all_values()
-    df_setup = pd.DataFrame(data[1:], columns=data[0])
-    
-    # Filter for the specific user (case insensitive)
-    user_row = df_setup[df_setup['user'].str.lower() == username.lower()]
-    
-    if len(user_row) == 0:
-        return None
-    
-    # Get sheet ID from mtg_input_file column
-    if 'mtg_output_file' in df_setup.columns:
-        sheet_id = user_row['mtg_output_file'].iloc[0]
-        # Extract sheet ID from URL if necessary
-        if 'spreadsheets/d/' in sheet_id:
-            sheet_id = sheet_id.split('spreadsheets/d/')[1].split('/')[0]
-        return sheet_id
-    else:
-        raise ValueError("MTG input file column not found in setup sheet")
-
-def clean_price(value):
-    """Clean price values and return with thousand separator"""
-    if pd.isna(value) or value == 'N/A':
-        return None
-    if isinstance(value, (int, float)):
-        return float(value)
-    try:
-        # Remove currency symbols and spaces
-        cleaned = str(value).replace('€', '').replace('£', '').replace('$', '').strip()
-        # Replace comma with dot for decimal point
-        cleaned = cleaned.replace(',', '.')
-        # Split by dots and take the last value (assuming it's the decimal part)
-        parts = cleaned.split('.')
-        if len(parts) > 2:
-            # If there are multiple dots, reconstruct the number properly
-            integer_part = ''.join(parts[:-1])
-            decimal_part = parts[-1]
-            cleaned = f"{integer_part}.{decimal_part}"
-        return float(cleaned)
-    except:
-        return None
-
 def format_price(value):
     """Format price values with currency symbol"""
     if pd.isna(value) or value is None:
@@ -807,41 +875,62 @@ def format_price(value):
     except (ValueError, TypeError):
         return value  # Return original value if conversion fails
 
-def clean_percentage(value):
+def render_column_presets(dimension_cols, metric_cols):
     """
-    Clean percentage values with extensive error handling.
-    Returns float as decimal (e.g., 0.05 for 5%)
+    Saved column layouts of the Inventory Details grid (per user, stored in the
+    "column_presets_path" file). Picking a preset fills both column selectors
+    before they render, so it costs a single rerun.
     """
-    if pd.isna(value) or value == 'N/A' or value == '' or value == 'null' or value is None:
-        return None
-        
-    # If already a float/int, just handle the decimal conversion
-    if isinstance(value, (float, int)):
-        # If it's already in decimal form (between -1 and 1), return as is
-        if -1 <= value <= 1:
-            return value
-        # If it's in percentage form (e.g., 5 for 5%), convert to decimal
-        return value / 100
-        
-    # Handle string values
-    try:
-        # Remove any whitespace and handle different percentage formats
-        cleaned = str(value).strip().replace(',', '.').lower()
-        
-        # Handle percentage sign
-        if '%' in cleaned:
-            cleaned = cleaned.replace('%', '').strip()
-            value_float = float(cleaned) / 100
-        else:
-            value_float = float(cleaned)
-            # If the number is too large to be a decimal, assume it's a percentage
-            if value_float > 1 or value_float < -1:
-                value_float = value_float / 100
-                
-        return value_float
-        
-    except (ValueError, TypeError, AttributeError):
-        return None
+    username = st.session_state.username
+    path = get_setting("column_presets_path", presets.PRESETS_PATH)
+    user_presets = presets.load_presets(username, path)
+
+    def apply_preset():
+        columns = user_presets.get(st.session_state.tab3_preset)
+        if columns is None:
+            return
+        st.session_state.tab3_dimensions = [col for col in columns if col in dimension_cols]
+        st.session_state.tab3_metrics = [col for col in columns if col in metric_cols]
+        st.session_state.tab3_preset_name = st.session_state.tab3_preset
+
+    def save_current():
+        name = st.session_state.tab3_preset_name.strip()
+        if name:
+            columns = st.session_state.tab3_dimensions + st.session_state.tab3_metrics
+            presets.save_preset(username, name, columns, path)
+            st.session_state.tab3_preset = name
+
+    def delete_selected():
+        if st.session_state.tab3_preset:
+            presets.delete_preset(username, st.session_state.tab3_preset, path)
+            st.session_state.tab3_preset = ""
+
+    col_preset, col_name, col_save, col_delete = st.columns([3, 3, 1, 1], vertical_alignment="bottom")
+    with col_preset:
+        st.selectbox(
+            "Column preset",
+            [""] + sorted(user_presets),
+            format_func=lambda name: name or "Choose a saved layout",
+            on_change=apply_preset,
+            key="tab3_preset"
+        )
+    with col_name:
+        st.text_input("Preset name", placeholder="Save the current columns as...", key="tab3_preset_name")
+    with col_save:
+        st.button("Save", on_click=save_current, use_container_width=True, key="tab3_preset_save")
+    with col_delete:
+        st.button("Delete", on_click=delete_selected, disabled=not st.session_state.get("tab3_preset"),
+                  use_container_width=True, key="tab3_preset_delete")
+
+def format_age(seconds):
+    """Format a duration in seconds as a human friendly age, e.g. '5 min ago'"""
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    return f"{int(seconds // 86400)} days ago"
 
 def format_percentage(value):
     """
@@ -861,135 +950,139 @@ def format_percentage(value):
     except (ValueError, TypeError):
         return None
 
-@st.cache_data
-def load_user_data(username):
-    """Load data for specific user from their Google Sheet"""
-    credentials = get_credentials()
-    gc = gspread.authorize(credentials)
-    
-    # Get user's sheet ID
-    sheet_id = get_user_sheet_id(username)
-    
-    if sheet_id is None:
-        raise ValueError("User not found in setup sheet")
-    
-    sheet = gc.open_by_key(sheet_id)
-    worksheet = sheet.get_worksheet(0)
-    
-    # Get data and convert to DataFrame
-    data = worksheet.get_all_values()
-    df = pd.DataFrame(data[1:], columns=data[0])
-    
-    # Get glossary sheet
-    sheet_glossary = gc.open_by_key('1aVRXJ373tp_4gjd1bPpexrpwOrVwr0Z49LB1SMz_90U')
-    worksheet_glossary = sheet_glossary.get_worksheet(0)
-    
-    # Get data and convert to DataFrame
-    data_glossary = worksheet_glossary.get_all_values()
-    df_glossary = pd.DataFrame(data_glossary[1:], columns=data_glossary[0])
+@st.cache_resource
+def get_sheets_gateway():
+    """
+    Process-wide Google Sheets gateway shared by every session. Identical reads
+    in flight at the same time (or finished less than "sheets_result_ttl"
+    seconds ago) share one request, and requests are paced to stay within
+    "sheets_requests_per_minute": bursts of a sixth of the quota, then a
+    steady rate that keeps every 60 second window under it.
+    """
+    import gspread
+    import sheets
+
+    per_minute = float(get_setting("sheets_requests_per_minute", 60))
+    burst = max(1, int(per_minute // 6))
+    return sheets.SheetsGateway(
+        gspread.authorize(get_credentials()),
+        coalescer=caching.SingleFlight(float(get_setting("sheets_result_ttl", 10)), name='sheets'),
+        governor=sheets.TokenBucket(max(per_minute - burst, 1) / 60, burst),
+    )
+
+
+@st.cache_resource
+def get_data_source():
+    """
+    Where the setup table, the user portfolios and the glossary are read from:
+    Google Sheets, or with the "data_source" setting on "local" the CSV, Parquet
+    or SQLite files of the "local_data_dir" directory (see sources.LocalSheets).
+    """
+    if get_setting("data_source", "sheets") == "local":
+        return sources.LocalSheets(get_setting("local_data_dir", "data"))
+    return get_sheets_gateway()
+
 
-    df = df.merge(df_glossary, left_on=['card_name', 'card_set'], right_on=['card_name', 'card_set'], how='left')
+def get_setup_sheet_id():
+    if get_setting("data_source", "sheets") == "local":
+        return get_setting("sheets_setup_id", sources.SETUP_NAME)
+    return st.secrets["sheets_setup_id"]
 
-    # Create card_name_set column
-    df['card_name_set'] = df.apply(
-        lambda x: f"{x['card_name']} - {x['card_set']} - {'Foil' if x['foil'] == 'Yes' else 'Regular'}", 
-        axis=1
+
+@st.cache_resource
+def get_user_data_store():
+    """
+    Process-wide stale-while-revalidate store of cleaned user data, keyed by username.
+    Snapshots older than the "user_data_max_age" setting (seconds) are refreshed
+    from the data source on a background thread. With the "user_data_sync" setting
+    on "delta" a refresh only re-cleans the rows that changed in the sheet.
+    Once the frames (and the delta sync state kept per user) take more than
+    "user_data_max_mb" the least recently viewed users are evicted. With a
+    shared cache tier a frame another worker fetched less than
+    "user_data_max_age" ago is read from it instead.
+    """
+    gateway = get_data_source()
+    setup_sheet_id = get_setup_sheet_id()
+    sheet_sync = portfolio.UserSheetSync() if get_setting("user_data_sync", "delta") == "delta" else None
+    shared_cache = get_shared_cache()
+
+    def read_user_sheet(username, setup_row=None):
+        if sheet_sync is not None:
+            return sheet_sync.load(gateway, setup_sheet_id, username, setup_row)
+        return portfolio.load_user_data(gateway, setup_sheet_id, username, setup_row)
+
+    def fetch_user_data(username, setup_row=None):
+        if shared_cache is None:
+            return caching.SharedFrame(read_user_sheet(username, setup_row))
+        loaded = []
+
+        def load():
+            loaded.append(True)
+            return read_user_sheet(username, setup_row)
+
+        snapshot = shared_cache.get_or_load(('user-data', username), load, max_age)
+        if not loaded:
+            # Another worker's frame: the local sync state is outdated and would
+            # hold a second copy of the data
+            forget_user_data(username)
+        return caching.Snapshot(caching.SharedFrame(snapshot.value), snapshot.fetched_at)
+
+    def forget_user_data(username):
+        if sheet_sync is not None:
+            sheet_sync.forget(username)
+
+    def user_data_size(username, frame):
+        return frame.nbytes + (sheet_sync.nbytes(username) if sheet_sync is not None else 0)
+
+    max_age = float(get_setting("user_data_max_age", 900))
+    max_bytes = int(float(get_setting("user_data_max_mb", 512)) * 1024 * 1024)
+    return caching.StaleWhileRevalidate(
+        fetch_user_data,
+        max_age,
+        name='user-data',
+        max_bytes=max_bytes,
+        sizer=user_data_size,
+        on_evict=forget_user_data
     )
-    
-    # Price-related columns
-    price_columns = [
-        'trend_price', 'efficient_price', 'conservative_price', 
-        'from_price', 'value_price', 'purchase_price', 'listed_price', 'purchase_price_diff',
-        'total_efficient_value', 'total_conservative_value', 'ms_trend_price'
-    ]
-    
-    # Other numeric columns
-    numeric_columns = [
-        'amount', 'total_stock', 'country_stock', 'listed_stock'
-    ]
-    
-    percentage_columns = [
-        'price_growth', 'equity_in_country', 'equity_on_cardmarket', 'price_diff_d7'
-    ]
-
-    # Clean price columns
-    for col in price_columns:
-        if col in df.columns:
-            df[col] = df[col].apply(clean_price)
-    
-    # Clean other numeric columns
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col].replace('N/A', pd.NA), errors='coerce')
-    
-    # Clean up text columns
-    text_columns = ['card_name', 'card_set', 'language', 'condition', 'foil', 'signed', 'country', 'alerts', 'collection_number', 'rarity', 'reserved_list', 'set_release_date', 'frame_era', 'set_type']
-    for col in text_columns:
-        if col in df.columns:
-            df[col] = df[col].replace('N/A', None)
-
-    
-    # Clean percentage columns first (convert to decimal form)
-    for col in percentage_columns:
-        if col in df.columns:
-            # Convert NaN to None
-            df[col] = df[col].replace({pd.NA: None, np.nan: None})
-            # Apply cleaning function
-            df[col] = df[col].apply(clean_percentage)
-    
-    df['difference'] = (pd.to_datetime(df['date'], errors='coerce') - pd.to_datetime(df['last_sold_date'], errors='coerce')).dt.days
-
-    # Assign values based on the difference
-    def categorize_difference(diff):
-        if 0 <= diff <= 1:
-            return 'Very High'
-        elif 2 <= diff <= 7:
-            return 'High'
-        elif 8 <= diff <= 14:
-            return 'Moderate'
-        elif 15 <= diff <= 30:
-            return 'Low'
-        elif diff > 30:
-            return 'Very Low'
-        else:
-            return 'Not Available'  # In case of negative differences
 
-    # Create the new column based on the difference
-    df['liquidity'] = df['difference'].apply(categorize_difference)
-    df = df.drop(columns=['difference'])
 
-    # Ensure purchase_price is numeric and handle Nulls and empty spaces
-    df['purchase_price'] = pd.to_numeric(df['purchase_price'].replace('', np.nan), errors='coerce')
+def load_user_data(username):
+    """Load data for specific user from their Google Sheet (last snapshot, refreshed in the background)"""
+    return get_user_data_store().get(username)
+
+
+def prefetch_user_data(username, setup_row):
+    """Start fetching a user's data in the background, reusing the setup row read at login"""
+    get_user_data_store().prefetch(username, setup_row)
 
-    # Calculate the purchase price difference, treating NaNs as 0
-    df['purchase_price_diff'] = df['efficient_price'] - df['purchase_price'].fillna(0)
 
-    return df
+def render_dashboard_skeleton():
+    """Placeholder dashboard streamed while the user's data is still being fetched"""
+    st.markdown(
+        '<p style="color: #aaaaaa; margin: 1rem 0 2rem 0;">Loading your portfolio…</p>',
+        unsafe_allow_html=True
+    )
+    st.tabs(["Portfolio Overview", "Price Analysis", "Inventory Details", "Historical Trends"])
+    for col in st.columns([1, 1, 1, 1, 2]):
+        with col:
+            st.markdown(
+                '<div style="height: 5rem; border-radius: 5px; background: rgba(255, 255, 255, 0.06);"></div>',
+                unsafe_allow_html=True
+            )
 
 
 def verify_credentials(username, password):
-    """Verify username and password against the setup sheet"""
-    credentials = get_credentials()
-    gc = gspread.authorize(credentials)
-    
-    # Get setup sheet ID from secrets
-    setup_sheet_id = st.secrets["sheets_setup_id"]
-    setup_sheet = gc.open_by_key(setup_sheet_id)
-    setup_worksheet = setup_sheet.get_worksheet(0)
-    
-    # Get data and convert to DataFrame
-    data = setup_worksheet.get_all_values()
-    df_setup = pd.DataFrame(data[1:], columns=data[0])
+    """Verify username and password against the setup sheet: the user's setup row when they match, else None"""
+    # Get setup sheet ID (from secrets unless the data is local)
+    setup_sheet_id = get_setup_sheet_id()
+    setup_row = portfolio.get_setup_row(get_data_source(), setup_sheet_id, username)
     
-    # Filter for the specific user (case insensitive)
-    user_row = df_setup[df_setup['user'].str.lower() == username.lower()]
-    
-    if len(user_row) == 0:
-        return False
+    if setup_row is None:
+        return None
     
     # Check if password matches
-    stored_password = user_row['password'].iloc[0]
-    return password == stored_password
+    stored_password = setup_row['password']
+    return setup_row if password == stored_password else None
 
 def render_footer():
         logo_path = os.path.join(assets_path, 'Alpha_Logo.png')
@@ -1049,7 +1142,10 @@ if not st.session_state.username_selected:
         submit_button = st.form_submit_button("Login")
         
         if submit_button:
-            if verify_credentials(input_username, password):
+            setup_row = verify_credentials(input_username, password)
+            if setup_row is not None:
+                # The portfolio starts loading now, while the page switches to the dashboard
+                prefetch_user_data(input_username, setup_row)
                 st.session_state.username = input_username
                 st.session_state.username_selected = True
                 st.rerun()
@@ -1079,7 +1175,22 @@ if not st.session_state.username_selected:
 # Main app content (only shown after login)
 if st.session_state.username_selected and st.session_state.username:
     try:
-        df = load_user_data(st.session_state.username)
+        user_data_store = get_user_data_store()
+        with perf.stage('load_user_data'):
+            skeleton = None
+            if user_data_store.peek(st.session_state.username) is None:
+                # First load (usually the prefetch started at login): show the layout meanwhile
+                skeleton = st.empty()
+                with skeleton.container():
+                    render_dashboard_skeleton()
+            user_data = load_user_data(st.session_state.username)
+            if skeleton is not None:
+                skeleton.empty()
+        # The snapshot is shared by every session of this user: work on a view
+        df = user_data.value.view()
+        data_age = format_age(user_data_store.age(user_data))
+        if user_data_store.is_refreshing(st.session_state.username):
+            data_age += " (updating…)"
         
         if len(df) == 0:
             st.error("No data found for this username")
@@ -1135,7 +1246,7 @@ if st.session_state.username_selected and st.session_state.username:
                             font-size: 12px;
                             line-height: 1.5;
                             text-align: right;
-                        ">Data from Cardmarket as of {max_date}</p>''', unsafe_allow_html=True)
+                        ">Data from Cardmarket as of {max_date} · refreshed {data_age}</p>''', unsafe_allow_html=True)
             
             # Tabs for different views
             # Add this CSS to your existing styles
@@ -1167,7 +1278,10 @@ if st.session_state.username_selected and st.session_state.username:
 
             tab1, tab2, tab3, tab4 = st.tabs(["Portfolio Overview", "Price Analysis", "Inventory Details", "Historical Trends"])
             
-            with tab1:
+            with tab1, perf.stage('render.tab1'):
+                import plotly.colors as pc
+                import plotly.express as px
+
                 st.markdown(f'''
                             <h3 style="color: #03a088; margin-bottom: 0px;">Portfolio Overview</h3>
                             <p style="color: #ffffff; margin: -10px 0 30px 0; line-height: 1.2;">{tab_descriptions["Portfolio Overview"]}</p>''', unsafe_allow_html=True)
@@ -1209,9 +1323,10 @@ if st.session_state.username_selected and st.session_state.username:
                     
                 with col5:
                     max_price_diff_d7 = df['price_diff_d7'].max()
-                    max_price_diff_d7_card_name = df.loc[df['price_diff_d7'] == max_price_diff_d7, 'card_name'].iloc[0]
                     # Format percentage without f-string if it's already a string
+                    # (NaN when the pricing job has not filled the column yet)
                     if pd.notnull(max_price_diff_d7):
+                        max_price_diff_d7_card_name = df.loc[df['price_diff_d7'] == max_price_diff_d7, 'card_name'].iloc[0]
                         formatted_diff = format_percentage(max_price_diff_d7)
                         st.metric(
                             "Highest Price Change (7d)", 
@@ -1282,7 +1397,8 @@ if st.session_state.username_selected and st.session_state.username:
                 fig_sets.data[0].marker.colors = [color_mapping[set_name] for set_name in set_data['card_set']]
                 
                 # Display the chart
-                st.plotly_chart(
+                show_plotly_chart(
+                    "tab1.sets_treemap",
                     fig_sets, 
                     use_container_width=True,
                     config={
@@ -1345,7 +1461,8 @@ if st.session_state.username_selected and st.session_state.username:
                 fig_amounts.data[0].marker.colors = [color_mapping[set_name] for set_name in amount_data['card_set']]
 
                 # Display the chart
-                st.plotly_chart(
+                show_plotly_chart(
+                    "tab1.amounts_treemap",
                     fig_amounts, 
                     use_container_width=True,
                     config={
@@ -1412,7 +1529,7 @@ if st.session_state.username_selected and st.session_state.username:
                         marker=dict(colors=['#5b50c1', '#03a088'])  # Green for Yes, Purple for No
                     )
                     
-                    st.plotly_chart(fig_rl, use_container_width=True)
+                    show_plotly_chart("tab1.reserved_list_pie", fig_rl, use_container_width=True)
                 
                 with col2:
                     # Rarity pie chart
@@ -1469,15 +1586,15 @@ if st.session_state.username_selected and st.session_state.username:
                         marker=dict(colors=[rarity_colors.get(r, '#ffffff') for r in rarity_data['rarity']])
                     )
                     
-                    st.plotly_chart(fig_rarity, use_container_width=True)
+                    show_plotly_chart("tab1.rarity_pie", fig_rarity, use_container_width=True)
                 
                 with col3:
                     # Listed Status pie chart
                     st.markdown('<h5 style="color: #03a088; margin-bottom: -10px;">Listed Cards on Cardmarket</h3>', unsafe_allow_html=True)
                     
                     # Create listed status data
-                    df['listed_status'] = df['listed_stock'].apply(lambda x: 'Listed' if pd.notnull(x) and str(x).replace('.', '').isdigit() and float(x) > 0 else 'Not Listed')
-                    listed_counts = df.groupby('listed_status')['card_name'].nunique().reset_index()
+                    listed_status = pd.Series(np.where(df['listed_stock'] > 0, 'Listed', 'Not Listed'), index=df.index, name='listed_status')
+                    listed_counts = df.groupby(listed_status)['card_name'].nunique().reset_index()
                     listed_counts['percentage'] = (listed_counts['card_name'] / listed_counts['card_name'].sum() * 100)
                     
                     # Define color mapping
@@ -1528,10 +1645,12 @@ if st.session_state.username_selected and st.session_state.username:
                         ])
                     )
                     
-                    st.plotly_chart(fig_listed, use_container_width=True)
+                    show_plotly_chart("tab1.listed_pie", fig_listed, use_container_width=True)
                 render_footer()
 
-            with tab2:
+            with tab2, perf.stage('render.tab2'):
+                import plotly.express as px
+
                 st.markdown(f'''
                             <h5 style="color: #03a088; margin-bottom: -10px;">Price Analysis</h3>
                             <p style="color: #ffffff; margin: -10px 0 30px 0; line-height: 1.2;">{tab_descriptions["Price Analysis"]}</p>''', unsafe_allow_html=True)
@@ -1576,7 +1695,8 @@ if st.session_state.username_selected and st.session_state.username:
                     yaxis_title='Number of Cards'  # This will force the y-axis label
                 )
                 
-                st.plotly_chart(
+                show_plotly_chart(
+                    "tab2.price_histogram",
                     fig_price, 
                     use_container_width=True,
                     config={
@@ -1591,131 +1711,137 @@ if st.session_state.username_selected and st.session_state.username:
                     }
                 )
                 
-                # Create two columns for title and dropdown
-                col_title, col_dropdown = st.columns([2, 1])  # Adjust ratio as needed (3:1 here)
-
-                # Add styling for the dropdown
-                st.markdown("""
-                    <style>
-                    /* Dropdown container and input */
-                    div[data-baseweb="select"] {
-                        background-color: #202020 !important;
-                        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-                        border-radius: 4px !important;
-                        width: 100% !important;  /* Changed from 200px to 100% */
-                        margin-top: 30px;
-                    }
+                @st.fragment
+                @perf.fragment('tab2.growth_scatter')
+                def render_growth_scatter():
+                    """Metric selector and growth scatter chart, rerun on their own when the metric changes"""
+                    # Create two columns for title and dropdown
+                    col_title, col_dropdown = st.columns([2, 1])  # Adjust ratio as needed (3:1 here)
+
+                    # Add styling for the dropdown
+                    st.markdown("""
+                        <style>
+                        /* Dropdown container and input */
+                        div[data-baseweb="select"] {
+                            background-color: #202020 !important;
+                            border: 1px solid rgba(255, 255, 255, 0.1) !important;
+                            border-radius: 4px !important;
+                            width: 100% !important;  /* Changed from 200px to 100% */
+                            margin-top: 30px;
+                        }
                     
-                    /* Make the select container fill the width */
-                    [data-testid="column"] [data-testid="stMultiSelect"] {
-                        width: 100% !important;
-                    }
+                        /* Make the select container fill the width */
+                        [data-testid="column"] [data-testid="stMultiSelect"] {
+                            width: 100% !important;
+                        }
                     
-                    /* Force width on the select container */
-                    div[data-baseweb="select"] > div[data-baseweb="select-container"] {
-                        width: 100% !important;
-                    }
+                        /* Force width on the select container */
+                        div[data-baseweb="select"] > div[data-baseweb="select-container"] {
+                            width: 100% !important;
+                        }
                     
-                    /* Make the input field fill the width */
-                    div[data-baseweb="select"] input {
-                        width: 100% !important;
-                    }
+                        /* Make the input field fill the width */
+                        div[data-baseweb="select"] input {
+                            width: 100% !important;
+                        }
                     
-                    /* Dropdown options menu */
-                    div[role="listbox"] {
-                        background-color: #202020 !important;
-                        border: 1px solid #03a088 !important;
-                        width: 100% !important;
-                    }
+                        /* Dropdown options menu */
+                        div[role="listbox"] {
+                            background-color: #202020 !important;
+                            border: 1px solid #03a088 !important;
+                            width: 100% !important;
+                        }
                     
-                    /* Make sure the multiselect container fills the column */
-                    .stMultiSelect {
-                        width: 100% !important;
-                    }
-                    </style>
-                """, unsafe_allow_html=True)
+                        /* Make sure the multiselect container fills the column */
+                        .stMultiSelect {
+                            width: 100% !important;
+                        }
+                        </style>
+                    """, unsafe_allow_html=True)
                 
-                # Dropdown in the right column with right alignment
-                with col_dropdown:
-                    # Create a container with right alignment
-                    container = st.container()
-                    with container:
-                        selected_metric = st.selectbox(
-                            "Select Price Metric",
-                            ["Today vs D7", "Price Growth"],
-                            key="price_metric_selector",
-                            label_visibility="collapsed"
-                        )
-
-                # Title in the left column
-                with col_title:
-                    st.markdown(f'<h5 style="color: #03a088; margin-bottom: -10px; margin-top: 30px;">{selected_metric} vs Current Price</h3>', unsafe_allow_html=True)
-
-
-                # Create a temporary dataframe with formatted values based on selection
-                temp_df = df.copy()
-                if selected_metric == "Price Growth":
-                    y_column = 'price_growth'
-                    y_label = 'Price Growth (%)'
-                    temp_df['plot_value'] = temp_df['price_growth'].apply(lambda x: x * 100 if pd.notnull(x) else x)
-                else:  # Today vs D7
-                    y_column = 'price_diff_d7'
-                    y_label = 'Today vs D7 (%)'
-                    temp_df['plot_value'] = temp_df['price_diff_d7'].apply(lambda x: x * 100 if pd.notnull(x) else x)
+                    # Dropdown in the right column with right alignment
+                    with col_dropdown:
+                        # Create a container with right alignment
+                        container = st.container()
+                        with container:
+                            selected_metric = st.selectbox(
+                                "Select Price Metric",
+                                ["Today vs D7", "Price Growth"],
+                                key="price_metric_selector",
+                                label_visibility="collapsed"
+                            )
 
-                fig_growth = px.scatter(
-                    temp_df,
-                    x='efficient_price',
-                    y='plot_value',
-                    hover_data={
-                        'card_name': True,
-                        'plot_value': ':.1f',  # Format to 1 decimal place
-                    },
-                    labels={
-                        'efficient_price': 'Current Price (€)',
-                        'plot_value': y_label,
-                        'card_name': 'Card Name'
-                    }
-                )
+                    # Title in the left column
+                    with col_title:
+                        st.markdown(f'<h5 style="color: #03a088; margin-bottom: -10px; margin-top: 30px;">{selected_metric} vs Current Price</h3>', unsafe_allow_html=True)
+
+
+                    # Create a temporary dataframe with formatted values based on selection
+                    temp_df = df.copy()
+                    if selected_metric == "Price Growth":
+                        y_column = 'price_growth'
+                        y_label = 'Price Growth (%)'
+                        temp_df['plot_value'] = temp_df['price_growth'].apply(lambda x: x * 100 if pd.notnull(x) else x)
+                    else:  # Today vs D7
+                        y_column = 'price_diff_d7'
+                        y_label = 'Today vs D7 (%)'
+                        temp_df['plot_value'] = temp_df['price_diff_d7'].apply(lambda x: x * 100 if pd.notnull(x) else x)
+
+                    fig_growth = px.scatter(
+                        temp_df,
+                        x='efficient_price',
+                        y='plot_value',
+                        hover_data={
+                            'card_name': True,
+                            'plot_value': ':.1f',  # Format to 1 decimal place
+                        },
+                        labels={
+                            'efficient_price': 'Current Price (€)',
+                            'plot_value': y_label,
+                            'card_name': 'Card Name'
+                        }
+                    )
 
-                # Update the layout maintaining transparent background and adding % suffix
-                fig_growth.update_layout(
-                    height=450,
-                    margin=dict(t=20, l=20, r=20, b=20),
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='#ffffff'),
-                    autosize=True,
-                    yaxis=dict(
-                        ticksuffix="%",  # Add % to tick labels
+                    # Update the layout maintaining transparent background and adding % suffix
+                    fig_growth.update_layout(
+                        height=450,
+                        margin=dict(t=20, l=20, r=20, b=20),
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='#ffffff'),
+                        autosize=True,
+                        yaxis=dict(
+                            ticksuffix="%",  # Add % to tick labels
+                        )
                     )
-                )
                 
-                fig_growth.update_traces(
-                    marker=dict(
-                        color='#9b8ac1',  # Dot color
-                        size=8,  # Dot size
-                        opacity=1,  # Dot opacity
-                        line=dict(
-                            color='#9b8ac1',  # Dot border color
-                            width=0  # Dot border width
-                        )
-                    ))
+                    fig_growth.update_traces(
+                        marker=dict(
+                            color='#9b8ac1',  # Dot color
+                            size=8,  # Dot size
+                            opacity=1,  # Dot opacity
+                            line=dict(
+                                color='#9b8ac1',  # Dot border color
+                                width=0  # Dot border width
+                            )
+                        ))
                 
-                st.plotly_chart(
-                    fig_growth, 
-                    use_container_width=True,
-                    config={
-                        'displayModeBar': True,
-                        'displaylogo': False,
-                        'modeBarButtonsToRemove': ['select', 'lasso2d'],
-                        'responsive': True,
-                        'modeBarStyle': {
-                            'backgroundColor': 'transparent',
-                            'color': '#ffffff'
+                    show_plotly_chart(
+                        "tab2.growth_scatter",
+                        fig_growth, 
+                        use_container_width=True,
+                        config={
+                            'displayModeBar': True,
+                            'displaylogo': False,
+                            'modeBarButtonsToRemove': ['select', 'lasso2d'],
+                            'responsive': True,
+                            'modeBarStyle': {
+                                'backgroundColor': 'transparent',
+                                'color': '#ffffff'
+                            }
                         }
-                    }
-                )
+                    )
+                render_growth_scatter()
                 
                 
                 # Add spacing after charts
@@ -1895,430 +2021,653 @@ if st.session_state.username_selected and st.session_state.username:
 
                 render_footer()
 
-            with tab3:
+            with tab3, perf.stage('render.tab3'):
                 st.markdown(f'''
                             <h3 style="color: #03a088; margin-bottom: 0px;">Inventory Details</h3>
                             <p style="color: #ffffff; margin: -10px 0 30px 0; line-height: 1.2;">{tab_descriptions["Inventory Details"]}</p>''', unsafe_allow_html=True)
                 
-                # Create two columns for dimensions and metrics
-                col1, col2 = st.columns(2)
-                
-                selected_columns = []
-                
-                # Dimensions column
-                with col1:
-                    st.markdown('<p class="category-header-tab3">Dimensions</p>', unsafe_allow_html=True)
+                @st.fragment
+                @perf.fragment('tab3.inventory_grid')
+                def render_inventory_grid():
+                    """Column selectors and the inventory grid, rerun on their own when the selection changes"""
+                    from st_aggrid import GridOptionsBuilder, JsCode
+
                     dimension_cols = [col for col in column_categories["Dimensions"] if col in df.columns]
-                    if dimension_cols:
-                        selected_dims = st.multiselect(
-                            "",
-                            dimension_cols,
-                            default=[col for col in dimension_cols if col in DEFAULT_COLUMNS],
-                            format_func=lambda x: COLUMN_NAMES.get(x, x.replace('_', ' ').title()),
-                            label_visibility="collapsed"
-                        )
-                        selected_columns.extend(selected_dims)
-                
-                # Metrics column
-                with col2:
-                    st.markdown('<p class="category-header-tab3">Metrics</p>', unsafe_allow_html=True)
                     metric_cols = [col for col in column_categories["Metrics"] if col in df.columns]
-                    if metric_cols:
-                        selected_metrics = st.multiselect(
-                            "",
-                            metric_cols,
-                            default=[col for col in metric_cols if col in DEFAULT_COLUMNS],
-                            format_func=lambda x: COLUMN_NAMES.get(x, x.replace('_', ' ').title()),
-                            label_visibility="collapsed"
-                        )
-                        selected_columns.extend(selected_metrics)
+                    st.session_state.setdefault("tab3_dimensions", [col for col in dimension_cols if col in DEFAULT_COLUMNS])
+                    st.session_state.setdefault("tab3_metrics", [col for col in metric_cols if col in DEFAULT_COLUMNS])
+
+                    render_column_presets(dimension_cols, metric_cols)
 
-                # Format the DataFrame for display
-                display_df = df.copy()
+                    selected_columns = []
+
+                    # Column changes are batched: nothing reruns until "Apply columns"
+                    with st.form("tab3_columns", border=False):
+                        # Create two columns for dimensions and metrics
+                        col1, col2 = st.columns(2)
                 
-                # Define percentage columns
-                percentage_columns = [
-                    'price_growth', 'equity_in_country', 'equity_on_cardmarket', 'price_diff_d7'
-                ]
+                        # Dimensions column
+                        with col1:
+                            st.markdown('<p class="category-header-tab3">Dimensions</p>', unsafe_allow_html=True)
+                            if dimension_cols:
+                                selected_dims = st.multiselect(
+                                    "",
+                                    dimension_cols,
+                                    format_func=lambda x: COLUMN_NAMES.get(x, x.replace('_', ' ').title()),
+                                    label_visibility="collapsed",
+                                    key="tab3_dimensions"
+                                )
+                                selected_columns.extend(selected_dims)
                 
-                price_columns = [
-                    'trend_price', 'efficient_price', 'conservative_price', 
-                    'from_price', 'value_price', 'purchase_price', 'listed_price', 'purchase_price_diff'
-                    'total_efficient_value', 'total_conservative_value', 'ms_trend_price']
-
-                # Convert price columns to float before display
-                for col in price_columns:
-                    if col in display_df.columns:
-                        # Keep the original numeric values instead of formatting them
-                        display_df[col] = pd.to_numeric(display_df[col], errors='coerce')
+                        # Metrics column
+                        with col2:
+                            st.markdown('<p class="category-header-tab3">Metrics</p>', unsafe_allow_html=True)
+                            if metric_cols:
+                                selected_metrics = st.multiselect(
+                                    "",
+                                    metric_cols,
+                                    format_func=lambda x: COLUMN_NAMES.get(x, x.replace('_', ' ').title()),
+                                    label_visibility="collapsed",
+                                    key="tab3_metrics"
+                                )
+                                selected_columns.extend(selected_metrics)
+
+                        st.form_submit_button("Apply columns")
+
+                    # Format the DataFrame for display
+                    display_df = df.copy()
                 
-                # Format percentage columns
-                for col in percentage_columns:
-                    if col in display_df.columns:
-                        # Convert NaN to None before formatting
-                        display_df[col] = display_df[col].replace({pd.NA: None, np.nan: None})
-                        display_df[col] = display_df[col].apply(format_percentage)
+                    # Prices are already floats (coerced at load); format percentage columns
+                    for col in schema.columns_of_kind('percentage'):
+                        if col in display_df.columns:
+                            # Convert NaN to None before formatting
+                            display_df[col] = display_df[col].replace({pd.NA: None, np.nan: None})
+                            display_df[col] = display_df[col].apply(format_percentage)
                 
-                # Rename columns for display
-                display_df.columns = [COLUMN_NAMES.get(col, col.replace('_', ' ').title()) for col in display_df.columns]
+                    # Rename columns for display
+                    display_df.columns = [COLUMN_NAMES.get(col, col.replace('_', ' ').title()) for col in display_df.columns]
                 
-                # Update the dataframe display section
-                if selected_columns:
-                    display_columns = [COLUMN_NAMES.get(col, col.replace('_', ' ').title()) for col in selected_columns]
-                    df_display = display_df[display_columns].copy()
+                    # Update the dataframe display section
+                    if selected_columns:
+                        display_columns = [COLUMN_NAMES.get(col, col.replace('_', ' ').title()) for col in selected_columns]
+                        df_display = display_df[display_columns].copy()
                     
-                    # Transform Alerts column
-                    if 'Alerts' in df_display.columns:
-                        def transform_alerts(value):
-                            if pd.isna(value) or value is None:
-                                return None
-                            # Convert to string to handle all cases
-                            value = str(value)
-                            # Handle L and U cases first
-                            if value == 'L':
-                                return 'Listed'
-                            if value == 'U':
-                                return 'Urgent'
-                            # Remove € sign and try to convert to integer
-                            try:
-                                cleaned_value = value.replace('€', '').strip()
-                                return str(int(float(cleaned_value)))
-                            except Exception:
-                                return value
+                        # Transform Alerts column
+                        if 'Alerts' in df_display.columns:
+                            def transform_alerts(value):
+                                if pd.isna(value) or value is None:
+                                    return None
+                                # Convert to string to handle all cases
+                                value = str(value)
+                                # Handle L and U cases first
+                                if value == 'L':
+                                    return 'Listed'
+                                if value == 'U':
+                                    return 'Urgent'
+                                # Remove € sign and try to convert to integer
+                                try:
+                                    cleaned_value = value.replace('€', '').strip()
+                                    return str(int(float(cleaned_value)))
+                                except Exception:
+                                    return value
                         
-                        df_display['Alerts'] = df_display['Alerts'].apply(transform_alerts)
+                            df_display['Alerts'] = df_display['Alerts'].apply(transform_alerts)
                     
-                    gb = GridOptionsBuilder.from_dataframe(df_display)
+                        gb = GridOptionsBuilder.from_dataframe(df_display)
                     
-                    # Set default column properties
-                    gb.configure_default_column(
-                        filterable=True,
-                        sorteable=True,
-                        resizable=True,
-                        filter=True,
-                        menuTabs=['filterMenuTab', 'generalMenuTab']
-                    )
+                        # Set default column properties
+                        gb.configure_default_column(
+                            filterable=True,
+                            sorteable=True,
+                            resizable=True,
+                            filter=True,
+                            menuTabs=['filterMenuTab', 'generalMenuTab']
+                        )
                     
-                    # Configure specific columns
-                    for col in df_display.columns:
-                        if col == 'Card Name':
-                            # Make Card Name column wider
+                        # Configure specific columns
+                        for col in df_display.columns:
+                            if col == 'Card Name':
+                                # Make Card Name column wider
+                                gb.configure_column(
+                                    col,
+                                    minWidth=300,  # Minimum width in pixels
+                                    type=["textColumn", "textColumnFilter"],
+                                    filter=True,
+                                    filterParams={
+                                        'buttons': ['reset', 'apply'],
+                                        'closeOnApply': True
+                                    }
+                                )
+    
+                            elif col in ['From Price', 'Trend Price', 'MS Trend Price', 'Efficient Price', 'Conservative Price', 'Value Price', 'Purchase Price', 'Purchase Price Change', 'Cardmarket Listed Price', 'Listed Price']:
+                                # Make Card Name column wider
+                                gb.configure_column(
+                                    col,
+                                    valueFormatter="'€' + x.toLocaleString('en-GB', {minimumFractionDigits: 2, maximumFractionDigits: 2})"
+                                )
+
+                            elif col in ['Today vs D7', 'Price Growth', 'Equity in Country', 'Equity on Cardmarket', 'Purchase Price Change %']:
+                                cellStyle = JsCode("""
+                                function(params) {
+                                    if (params.value === null || params.value === undefined) return {};
+                                    const val = parseFloat(params.value.replace('%', ''));
+                                    if (val > 0) return { color: '#00a195' };
+                                    if (val < 0) return { color: '#e9536f' };
+                                    return { color: '#fab900' };
+                                }
+                                """)
+                                gb.configure_column(
+                                    col,
+                                    type=["numericColumn", "numberColumnFilter"],
+                                    filter=True,
+                                    filterParams={
+                                        'buttons': ['reset', 'apply'],
+                                        'closeOnApply': True
+                                    },
+                                    cellStyle=cellStyle
+                                )
+                            else:
+                                gb.configure_column(
+                                    col,
+                                    type=["textColumn", "textColumnFilter"],
+                                    filter=True,
+                                    filterParams={
+                                        'buttons': ['reset', 'apply'],
+                                        'closeOnApply': True
+                                    }
+                                )
+
+                        # Add this specific configuration for the Alerts column
+                        if 'Alerts' in df_display.columns:
+                            alerts_cell_style = JsCode("""
+                            function(params) {
+                                if (params.value === null || params.value === undefined) return {};
+                                if (params.value === 'Listed') return { color: '#6d6ed1' };
+                                if (params.value === 'Urgent') return { color: '#5b50c1' };
+                                const val = parseInt(params.value);
+                                if (isNaN(val)) return {};
+                                const colors = {
+                                    0: '#ffffff',
+                                    1: '#ffd4d4',
+                                    2: '#ffb3b3',
+                                    3: '#ff8080',
+                                    4: '#ff4d4d',
+                                    5: '#e9536f'
+                                };
+                                return { color: colors[val] || '#ffffff' };
+                            }
+                            """)
+                        
                             gb.configure_column(
-                                col,
-                                minWidth=300,  # Minimum width in pixels
+                                'Alerts',
                                 type=["textColumn", "textColumnFilter"],
                                 filter=True,
                                 filterParams={
                                     'buttons': ['reset', 'apply'],
                                     'closeOnApply': True
-                                }
-                            )
-    
-                        elif col in ['From Price', 'Trend Price', 'MS Trend Price', 'Efficient Price', 'Conservative Price', 'Value Price', 'Purchase Price', 'Purchase Price Change', 'Cardmarket Listed Price', 'Listed Price']:
-                            # Make Card Name column wider
-                            gb.configure_column(
-                                col,
-                                valueFormatter="'€' + x.toLocaleString('en-GB', {minimumFractionDigits: 2, maximumFractionDigits: 2})"
+                                },
+                                cellStyle=alerts_cell_style
                             )
 
-                        elif col in ['Today vs D7', 'Price Growth', 'Equity in Country', 'Equity on Cardmarket', 'Purchase Price Change %']:
-                            cellStyle = JsCode("""
+                        if 'Liquidity' in df_display.columns:
+                            liquidity_cell_style = JsCode("""
                             function(params) {
                                 if (params.value === null || params.value === undefined) return {};
-                                const val = parseFloat(params.value.replace('%', ''));
-                                if (val > 0) return { color: '#00a195' };
-                                if (val < 0) return { color: '#e9536f' };
-                                return { color: '#fab900' };
+                                if (params.value === 'Very High') return { color: '#43aa8b' };
+                                if (params.value === 'High') return { color: '#90be6d' };
+                                if (params.value === 'Moderate') return { color: '#f9c74f' };
+                                if (params.value === 'Low') return { color: '#f8961e' };
+                                if (params.value === 'Very Low') return { color: '#f94144' };
+                                const val = parseInt(params.value);
+                                if (isNaN(val)) return {};
+                                return { color: colors[val] || '#ffffff' };
                             }
                             """)
+                        
                             gb.configure_column(
-                                col,
-                                type=["numericColumn", "numberColumnFilter"],
+                                'Liquidity',
+                                type=["textColumn", "textColumnFilter"],
                                 filter=True,
                                 filterParams={
                                     'buttons': ['reset', 'apply'],
                                     'closeOnApply': True
                                 },
-                                cellStyle=cellStyle
+                                cellStyle=liquidity_cell_style
                             )
-                        else:
+
+                        if 'Purchase Price Change' in df_display.columns:
+                            purchase_price_change_cell_style = JsCode("""
+                            function(params) {
+                                if (params.value === null || params.value === undefined) return {};
+                                if (params.value > 0) return { color: '#00a195' };
+                                if (params.value < 0) return { color: '#e9536f' };
+                                const val = parseInt(params.value);
+                                if (isNaN(val)) return {};
+                                return { color: colors[val] || '#ffffff' };
+                            }
+                            """)
+                        
                             gb.configure_column(
-                                col,
+                                'Purchase Price Change',
                                 type=["textColumn", "textColumnFilter"],
                                 filter=True,
                                 filterParams={
                                     'buttons': ['reset', 'apply'],
                                     'closeOnApply': True
-                                }
+                                },
+                                cellStyle=purchase_price_change_cell_style
                             )
 
-                    # Add this specific configuration for the Alerts column
-                    if 'Alerts' in df_display.columns:
-                        alerts_cell_style = JsCode("""
-                        function(params) {
-                            if (params.value === null || params.value === undefined) return {};
-                            if (params.value === 'Listed') return { color: '#6d6ed1' };
-                            if (params.value === 'Urgent') return { color: '#5b50c1' };
-                            const val = parseInt(params.value);
-                            if (isNaN(val)) return {};
-                            const colors = {
-                                0: '#ffffff',
-                                1: '#ffd4d4',
-                                2: '#ffb3b3',
-                                3: '#ff8080',
-                                4: '#ff4d4d',
-                                5: '#e9536f'
-                            };
-                            return { color: colors[val] || '#ffffff' };
-                        }
-                        """)
-                        
-                        gb.configure_column(
-                            'Alerts',
-                            type=["textColumn", "textColumnFilter"],
-                            filter=True,
-                            filterParams={
-                                'buttons': ['reset', 'apply'],
-                                'closeOnApply': True
-                            },
-                            cellStyle=alerts_cell_style
-                        )
-
-                    if 'Liquidity' in df_display.columns:
-                        liquidity_cell_style = JsCode("""
-                        function(params) {
-                            if (params.value === null || params.value === undefined) return {};
-                            if (params.value === 'Very High') return { color: '#43aa8b' };
-                            if (params.value === 'High') return { color: '#90be6d' };
-                            if (params.value === 'Moderate') return { color: '#f9c74f' };
-                            if (params.value === 'Low') return { color: '#f8961e' };
-                            if (params.value === 'Very Low') return { color: '#f94144' };
-                            const val = parseInt(params.value);
-                            if (isNaN(val)) return {};
-                            return { color: colors[val] || '#ffffff' };
-                        }
-                        """)
-                        
-                        gb.configure_column(
-                            'Liquidity',
-                            type=["textColumn", "textColumnFilter"],
-                            filter=True,
-                            filterParams={
-                                'buttons': ['reset', 'apply'],
-                                'closeOnApply': True
-                            },
-                            cellStyle=liquidity_cell_style
-                        )
-
-                    if 'Purchase Price Change' in df_display.columns:
-                        purchase_price_change_cell_style = JsCode("""
-                        function(params) {
-                            if (params.value === null || params.value === undefined) return {};
-                            if (params.value > 0) return { color: '#00a195' };
-                            if (params.value < 0) return { color: '#e9536f' };
-                            const val = parseInt(params.value);
-                            if (isNaN(val)) return {};
-                            return { color: colors[val] || '#ffffff' };
-                        }
-                        """)
-                        
-                        gb.configure_column(
-                            'Purchase Price Change',
-                            type=["textColumn", "textColumnFilter"],
-                            filter=True,
-                            filterParams={
-                                'buttons': ['reset', 'apply'],
-                                'closeOnApply': True
-                            },
-                            cellStyle=purchase_price_change_cell_style
-                        )
-
-                    # Add additional grid options
-                    grid_options = gb.build()
-                    grid_options['enableRangeSelection'] = True
-                    grid_options['enableColumnFilter'] = True
-                    grid_options['enableFilter'] = True
+                        # Add additional grid options
+                        grid_options = gb.build()
+                        grid_options['enableRangeSelection'] = True
+                        grid_options['enableColumnFilter'] = True
+                        grid_options['enableFilter'] = True
                     
-                    # Custom CSS for AgGrid
-                    grid_css = {
-                        ".ag-root.ag-theme-streamlit": {"background-color": "#202020"},
-                        ".ag-theme-streamlit .ag-header": {"background-color": "#1f2335"},
-                        ".ag-theme-streamlit .ag-header-cell": {"color": "#03a088"},
-                        ".ag-theme-streamlit .ag-cell": {"color": "#c0caf5"},
-                        ".ag-theme-streamlit .ag-row-even": {"background-color": "#202020"},
-                        ".ag-theme-streamlit .ag-row-odd": {"background-color": "#1f2335"},
-                        ".ag-theme-streamlit .ag-row:hover": {"background-color": "#292e42"},
-                        ".ag-theme-streamlit .ag-filter-toolpanel-header": {"background-color": "#1f2335", "color": "#03a088"},
-                        ".ag-theme-streamlit .ag-filter": {"background-color": "#202020"},
-                        ".ag-theme-streamlit .ag-filter-header": {"background-color": "#1f2335"},
-                        ".ag-theme-streamlit .ag-filter-filter": {"background-color": "#1f2335", "color": "#c0caf5", "border-color": "#03a088"},
-                        ".ag-theme-streamlit .ag-filter-value": {"background-color": "#1f2335", "color": "#c0caf5", "border-color": "#03a088"},
-                        ".ag-theme-streamlit .ag-menu": {"background-color": "#202020", "border-color": "#03a088"},
-                        ".ag-theme-streamlit .ag-menu-option": {"color": "#c0caf5"},
-                        ".ag-theme-streamlit .ag-menu-option:hover": {"background-color": "#292e42"}
-                    }
+                        # Custom CSS for AgGrid
+                        grid_css = {
+                            ".ag-root.ag-theme-streamlit": {"background-color": "#202020"},
+                            ".ag-theme-streamlit .ag-header": {"background-color": "#1f2335"},
+                            ".ag-theme-streamlit .ag-header-cell": {"color": "#03a088"},
+                            ".ag-theme-streamlit .ag-cell": {"color": "#c0caf5"},
+                            ".ag-theme-streamlit .ag-row-even": {"background-color": "#202020"},
+                            ".ag-theme-streamlit .ag-row-odd": {"background-color": "#1f2335"},
+                            ".ag-theme-streamlit .ag-row:hover": {"background-color": "#292e42"},
+                            ".ag-theme-streamlit .ag-filter-toolpanel-header": {"background-color": "#1f2335", "color": "#03a088"},
+                            ".ag-theme-streamlit .ag-filter": {"background-color": "#202020"},
+                            ".ag-theme-streamlit .ag-filter-header": {"background-color": "#1f2335"},
+                            ".ag-theme-streamlit .ag-filter-filter": {"background-color": "#1f2335", "color": "#c0caf5", "border-color": "#03a088"},
+                            ".ag-theme-streamlit .ag-filter-value": {"background-color": "#1f2335", "color": "#c0caf5", "border-color": "#03a088"},
+                            ".ag-theme-streamlit .ag-menu": {"background-color": "#202020", "border-color": "#03a088"},
+                            ".ag-theme-streamlit .ag-menu-option": {"color": "#c0caf5"},
+                            ".ag-theme-streamlit .ag-menu-option:hover": {"background-color": "#292e42"}
+                        }
                     
-                    # Display the grid
-                    AgGrid(
-                        df_display,
-                        gridOptions=grid_options,
-                        height=600,
-                        custom_css=grid_css,
-                        theme="streamlit",
-                        allow_unsafe_jscode=True,
-                        update_mode="model_changed",
-                        enable_enterprise_modules=False
-                    )
-                else:
-                    st.warning("Please select at least one column to display")
+                        # Display the grid
+                        show_aggrid(
+                            "tab3.inventory_grid",
+                            df_display,
+                            gridOptions=grid_options,
+                            height=600,
+                            custom_css=grid_css,
+                            theme="streamlit",
+                            allow_unsafe_jscode=True,
+                            update_mode="model_changed",
+                            enable_enterprise_modules=False
+                        )
+                    else:
+                        st.warning("Please select at least one column to display")
+                render_inventory_grid()
 
                 render_footer()
 
-            with tab4:
+            with tab4, perf.stage('render.tab4'):
+                import plotly.colors as pc
+                import plotly.express as px
+                import plotly.graph_objects as go
+
                 st.markdown(f'''
                             <h3 style="color: #03a088; margin-bottom: 0px;">Historical Trends</h3>
                             <p style="color: #ffffff; margin: -10px 0 30px 0; line-height: 1.2;">{tab_descriptions["Historical Trends"]}</p>''', unsafe_allow_html=True)
                 
-                # Load historical data
-                df_historical = load_historical_data()
-                
-                if not df_historical.empty:
-                    # Get user's cards
-                    user_cards = df['card_name_set'].unique()
-                    
-                    # Filter historical data for user's cards only
-                    df_historical_filtered = df_historical[df_historical['card_name_set'].isin(user_cards)]
-                    if not df_historical_filtered.empty:
-                        # Convert date column to datetime if it's not already
-                        df_historical_filtered['date'] = pd.to_datetime(df_historical_filtered['date'], errors='coerce')
-                        
-                        col1, col2 = st.columns([1, 1])
-                        with col1:
-                            selected_card = st.selectbox(
-                                "Select a Card",
-                                options=sorted(user_cards),
-                                index=0,
-                                label_visibility="visible",
-                                key="tab4_select"
+                @st.fragment
+                @perf.fragment('tab4.history')
+                def render_history_tab():
+                    """Historical Trends controls and charts, rerun on their own when a tab 4 widget changes"""
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        date_range = st.radio(
+                            "Date Range",
+                            list(HISTORY_DATE_RANGES.keys()),
+                            index=len(HISTORY_DATE_RANGES) - 1,
+                            horizontal=True,
+                            key="tab4_date_range"
+                        )
+                    with col2:
+                        chart_detail = st.selectbox(
+                            "Chart Detail",
+                            list(HISTORY_CHART_DETAIL.keys()),
+                            index=1,
+                            key="tab4_chart_detail"
+                        )
+                    max_points = HISTORY_CHART_DETAIL[chart_detail]
+
+                    # The range bounds are pushed into every historical query below
+                    history_watermark = historical.history_watermark()
+                    start_date = historical.range_start(
+                        load_latest_history_date(history_watermark),
+                        HISTORY_DATE_RANGES[date_range]
+                    )
+
+                    # Portfolio value over time (all holdings, aggregated per date)
+                    holdings, data_version = get_portfolio_holdings(df)
+                    df_portfolio_value = load_portfolio_value_history(
+                        holdings, data_version, start_date, history_watermark
+                    )
+
+                    if not df_portfolio_value.empty:
+                        st.markdown('<h5 style="color: #03a088; margin-bottom: -10px;">Portfolio Value History</h3>', unsafe_allow_html=True)
+
+                        fig_portfolio = px.line(
+                            historical.downsample(df_portfolio_value, 'date', 'total_value', max_points),
+                            x='date',
+                            y='total_value',
+                            custom_data=['cards_priced'],
+                            labels={
+                                'date': 'Date',
+                                'total_value': 'Portfolio Value (€)'
+                            }
+                        )
+
+                        fig_portfolio.update_layout(
+                            height=450,
+                            margin=dict(t=30, l=30, r=30, b=30),
+                            paper_bgcolor='rgba(0,0,0,0)',
+                            plot_bgcolor='rgba(0,0,0,0)',
+                            font=dict(color='#ffffff'),
+                            autosize=True,
+                            showlegend=False,
+                            hovermode='x unified',
+                            xaxis=dict(
+                                showgrid=True,
+                                gridcolor='rgba(255, 255, 255, 0.1)',
+                                tickformat='%Y-%m-%d',
+                                title=None
+                            ),
+                            yaxis=dict(
+                                showgrid=True,
+                                gridcolor='rgba(255, 255, 255, 0.1)',
+                                tickprefix='€'
                             )
+                        )
+
+                        fig_portfolio.update_traces(
+                            line=dict(color='#03a088', width=2),
+                            hovertemplate='<b>Date</b>: %{x|%Y-%m-%d}<br>' +
+                                        '<b>Value</b>: €%{y:,.2f}<br>' +
+                                        '<b>Cards Priced</b>: %{customdata[0]}<extra></extra>'
+                        )
+
+                        show_plotly_chart(
+                            "tab4.portfolio_value",
+                            fig_portfolio,
+                            use_container_width=True,
+                            config={
+                                'displayModeBar': True,
+                                'displaylogo': False,
+                                'modeBarButtonsToRemove': ['select', 'lasso2d'],
+                                'responsive': True,
+                                'modeBarStyle': {
+                                    'backgroundColor': 'transparent',
+                                    'color': '#ffffff'
+                                }
+                            }
+                        )
 
                         st.markdown('<br>', unsafe_allow_html=True)
 
-                        # Filter data for selected card
-                        card_data = df_historical_filtered[df_historical_filtered['card_name_set'] == selected_card]
+                    # Single card view or multi-card comparison
+                    view_mode = st.radio(
+                        "View",
+                        ["Single Card", "Compare Cards"],
+                        horizontal=True,
+                        key="tab4_view_mode"
+                    )
 
-                        if not card_data.empty:
-                            # Add metrics before the chart
-                            col1, col2, col3, col4 = st.columns(4)
-                            
+                    if view_mode == "Compare Cards":
+                        @st.fragment
+                        @perf.fragment('tab4.compare')
+                        def render_card_comparison():
+                            """Multi-card comparison; its widgets only rerun this fragment"""
+                            user_cards = sorted(df['card_name_set'].unique())
+                            col1, col2 = st.columns([3, 1])
                             with col1:
-                                min_price = card_data['efficient_price'].min()
-                                st.metric(f"Lowest Price", f"€{min_price:.2f}")
-                            
+                                compare_cards = st.multiselect(
+                                    "Select Cards to Compare",
+                                    options=user_cards,
+                                    default=user_cards[:min(3, len(user_cards))],
+                                    key="tab4_compare"
+                                )
                             with col2:
-                                max_price = card_data['efficient_price'].max()
-                                st.metric(f"Highest Price", f"€{max_price:.2f}")
-                            
-                            with col3:
-                                current_price = card_data.iloc[-1]['efficient_price']
-                                st.metric(f"Current Price", f"€{current_price:.2f}")
+                                normalize = st.toggle(
+                                    "Rebase to 100",
+                                    value=True,
+                                    key="tab4_compare_normalize"
+                                )
 
-                            with col4:
-                                avg_price = card_data['efficient_price'].mean()
-                                st.metric(f"Average Price", f"€{avg_price:.2f}")
+                            if compare_cards:
+                                # One batched query for all selected cards
+                                df_compare = load_cards_history(tuple(compare_cards), start_date, history_watermark)
+
+                                if not df_compare.empty:
+                                    if normalize:
+                                        rebased = historical.rebase_to_100(df_compare)
+                                        # Cards never priced above 0 have nothing to rebase on
+                                        df_compare = df_compare.assign(plot_value=rebased)[
+                                            historical.has_rebased_values(df_compare, rebased)
+                                        ]
+                                        y_label = 'Rebased Price (100 = first date)'
+                                        y_prefix = ''
+                                        y_format = '%{y:.1f}'
+                                    else:
+                                        df_compare = df_compare.assign(plot_value=df_compare['efficient_price'])
+                                        y_label = 'Price (€)'
+                                        y_prefix = '€'
+                                        y_format = '€%{y:.2f}'
+
+                                    # Switch to WebGL traces once the number of points gets large
+                                    trace_class = go.Scattergl if len(df_compare) > WEBGL_POINT_THRESHOLD else go.Scatter
+                                    colors = pc.sample_colorscale('Spectral', max(len(compare_cards), 2))
+
+                                    fig_compare = go.Figure()
+                                    for i, (card, card_series) in enumerate(df_compare.groupby('card_name_set', sort=False)):
+                                        card_series = historical.downsample(card_series, 'date', 'plot_value', max_points)
+                                        fig_compare.add_trace(trace_class(
+                                            x=card_series['date'],
+                                            y=card_series['plot_value'],
+                                            mode='lines',
+                                            name=card,
+                                            line=dict(color=colors[i % len(colors)], width=2),
+                                            hovertemplate=f'<b>{card}</b><br>' +
+                                                        '<b>Date</b>: %{x|%Y-%m-%d}<br>' +
+                                                        f'<b>Price</b>: {y_format}<extra></extra>'
+                                        ))
+
+                                    fig_compare.update_layout(
+                                        height=550,
+                                        margin=dict(t=30, l=30, r=30, b=30),
+                                        paper_bgcolor='rgba(0,0,0,0)',
+                                        plot_bgcolor='rgba(0,0,0,0)',
+                                        font=dict(color='#ffffff'),
+                                        autosize=True,
+                                        showlegend=True,
+                                        legend=dict(
+                                            orientation="h",
+                                            yanchor="top",
+                                            y=-0.1,
+                                            xanchor="center",
+                                            x=0.5,
+                                            font=dict(size=12)
+                                        ),
+                                        xaxis=dict(
+                                            showgrid=True,
+                                            gridcolor='rgba(255, 255, 255, 0.1)',
+                                            tickformat='%Y-%m-%d',
+                                            title=None
+                                        ),
+                                        yaxis=dict(
+                                            showgrid=True,
+                                            gridcolor='rgba(255, 255, 255, 0.1)',
+                                            tickprefix=y_prefix,
+                                            title=y_label
+                                        )
+                                    )
+
+                                    show_plotly_chart(
+                                        "tab4.compare",
+                                        fig_compare,
+                                        use_container_width=True,
+                                        config={
+                                            'displayModeBar': True,
+                                            'displaylogo': False,
+                                            'modeBarButtonsToRemove': ['select', 'lasso2d'],
+                                            'responsive': True,
+                                            'modeBarStyle': {
+                                                'backgroundColor': 'transparent',
+                                                'color': '#ffffff'
+                                            }
+                                        }
+                                    )
+                                else:
+                                    st.warning("No historical data available for the selected cards")
+                            else:
+                                st.warning("Please select at least one card to compare")
+                        render_card_comparison()
+                    else:
+                        @st.fragment
+                        @perf.fragment('tab4.card_history')
+                        def render_card_history():
+                            """Single card history; picking another card only reruns this fragment"""
+                            # Load historical data
+                            history_by_card = load_historical_data(start_date, history_watermark)
+                
+                            if history_by_card:
+                                # Get user's cards
+                                user_cards = df['card_name_set'].unique()
+                    
+                                # Check there is history for at least one of the user's cards
+                                if any(card in history_by_card for card in user_cards):
+                                    col1, col2 = st.columns([1, 1])
+                                    with col1:
+                                        selected_card = st.selectbox(
+                                            "Select a Card",
+                                            options=sorted(user_cards),
+                                            index=0,
+                                            label_visibility="visible",
+                                            key="tab4_select"
+                                        )
+
+                                    st.markdown('<br>', unsafe_allow_html=True)
+
+                                    # Look up data for selected card
+                                    card_handle = history_by_card.get(selected_card)
+                                    card_data = card_handle.view() if card_handle is not None else pd.DataFrame()
+
+                                    if not card_data.empty:
+                                        # Add metrics before the chart
+                                        col1, col2, col3, col4 = st.columns(4)
                             
-                            #st.markdown(f'<p style="color: #ffffff; margin-bottom: 1rem;">Price History for {selected_card}</p>', unsafe_allow_html=True)
-
-                            # Create the figure with both series
-                            fig = px.line(
-                                card_data,
-                                x='date',
-                                y='efficient_price',
-                                labels={
-                                    'date': 'Date',
-                                    'efficient_price': 'Price (€)'
-                                }
-                            )
-
-                            # Add the constant average price line
-                            fig.add_hline(
-                                y=avg_price,
-                                line_dash="dash",
-                                line_width=1,
-                                line_color="#fab900",
-                                annotation_text=f"Avg: €{avg_price:.2f}",
-                                annotation_position="left",
-                                annotation_font_color="#fab900"
-                            )
-
-                            # Update the layout to ensure colors are applied
-                            fig.update_layout(
-                                showlegend=True,
-                                hovermode='x unified'
-                            )
+                                        with col1:
+                                            min_price = card_data['efficient_price'].min()
+                                            st.metric(f"Lowest Price", f"€{min_price:.2f}")
+                            
+                                        with col2:
+                                            max_price = card_data['efficient_price'].max()
+                                            st.metric(f"Highest Price", f"€{max_price:.2f}")
+                            
+                                        with col3:
+                                            current_price = card_data.iloc[-1]['efficient_price']
+                                            st.metric(f"Current Price", f"€{current_price:.2f}")
 
-                            # Update legend names
-                            fig.data[0].name = 'Price'
+                                        with col4:
+                                            avg_price = card_data['efficient_price'].mean()
+                                            st.metric(f"Average Price", f"€{avg_price:.2f}")
                             
-                            # Update layout with specific title font size
-                            fig.update_layout(
-                                height=550,
-                                margin=dict(t=30, l=30, r=30, b=30),
-                                paper_bgcolor='rgba(0,0,0,0)',
-                                plot_bgcolor='rgba(0,0,0,0)',
-                                font=dict(color='#ffffff'),
-                                autosize=True,
-                                showlegend=False,
-                                title=dict(
-                                    text=f'Price History for {selected_card}',
-                                    font=dict(size=14),
-                                    y=1,  # Move title down from top (1.0 is top, 0 is bottom)
-                                    yanchor='top',  # Anchor point for the y position
-                                    pad=dict(b=20, l=20)  # Add padding above (t) and below (b) the title
-                                ),
-                                xaxis=dict(
-                                    showgrid=True,
-                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                    tickformat='%Y-%m-%d',
-                                    title=None 
-                                ),
-                                yaxis=dict(
-                                    showgrid=True,
-                                    gridcolor='rgba(255, 255, 255, 0.1)',
-                                    tickprefix='€',
-                                    range=[0, (card_data['efficient_price'].max() * 1.15)]
-                                )
-                            )
+                                        #st.markdown(f'<p style="color: #ffffff; margin-bottom: 1rem;">Price History for {selected_card}</p>', unsafe_allow_html=True)
+
+                                        # Create the figure with both series
+                                        fig = px.line(
+                                            historical.downsample(card_data, 'date', 'efficient_price', max_points),
+                                            x='date',
+                                            y='efficient_price',
+                                            labels={
+                                                'date': 'Date',
+                                                'efficient_price': 'Price (€)'
+                                            }
+                                        )
+
+                                        # Add the constant average price line
+                                        fig.add_hline(
+                                            y=avg_price,
+                                            line_dash="dash",
+                                            line_width=1,
+                                            line_color="#fab900",
+                                            annotation_text=f"Avg: €{avg_price:.2f}",
+                                            annotation_position="left",
+                                            annotation_font_color="#fab900"
+                                        )
+
+                                        # Update the layout to ensure colors are applied
+                                        fig.update_layout(
+                                            showlegend=True,
+                                            hovermode='x unified'
+                                        )
+
+                                        # Update legend names
+                                        fig.data[0].name = 'Price'
                             
-                            # Update line style
-                            fig.update_traces(
-                                line=dict(color='#03a088', width=2),
-                                hovertemplate='<b>Date</b>: %{x|%Y-%m-%d}<br>' +
-                                            '<b>Price</b>: €%{y:.2f}<extra></extra>'
-                            )
+                                        # Update layout with specific title font size
+                                        fig.update_layout(
+                                            height=550,
+                                            margin=dict(t=30, l=30, r=30, b=30),
+                                            paper_bgcolor='rgba(0,0,0,0)',
+                                            plot_bgcolor='rgba(0,0,0,0)',
+                                            font=dict(color='#ffffff'),
+                                            autosize=True,
+                                            showlegend=False,
+                                            title=dict(
+                                                text=f'Price History for {selected_card}',
+                                                font=dict(size=14),
+                                                y=1,  # Move title down from top (1.0 is top, 0 is bottom)
+                                                yanchor='top',  # Anchor point for the y position
+                                                pad=dict(b=20, l=20)  # Add padding above (t) and below (b) the title
+                                            ),
+                                            xaxis=dict(
+                                                showgrid=True,
+                                                gridcolor='rgba(255, 255, 255, 0.1)',
+                                                tickformat='%Y-%m-%d',
+                                                title=None 
+                                            ),
+                                            yaxis=dict(
+                                                showgrid=True,
+                                                gridcolor='rgba(255, 255, 255, 0.1)',
+                                                tickprefix='€',
+                                                range=[0, (card_data['efficient_price'].max() * 1.15)]
+                                            )
+                                        )
                             
-                            # Display the chart
-                            st.plotly_chart(
-                                fig,
-                                use_container_width=True,
-                                config={
-                                    'displayModeBar': True,
-                                    'displaylogo': False,
-                                    'modeBarButtonsToRemove': ['select', 'lasso2d'],
-                                    'responsive': True,
-                                    'modeBarStyle': {
-                                        'backgroundColor': 'transparent',
-                                        'color': '#ffffff'
-                                    }
-                                }
-                            )
+                                        # Update line style
+                                        fig.update_traces(
+                                            line=dict(color='#03a088', width=2),
+                                            hovertemplate='<b>Date</b>: %{x|%Y-%m-%d}<br>' +
+                                                        '<b>Price</b>: €%{y:.2f}<extra></extra>'
+                                        )
                             
-                        else:
-                            st.warning("No historical data available for selected card")
-                    else:
-                        st.warning("No historical data found for your cards")
-                else:
-                    st.error("Unable to load historical data")
+                                        # Display the chart
+                                        show_plotly_chart(
+                                            "tab4.card_history",
+                                            fig,
+                                            use_container_width=True,
+                                            config={
+                                                'displayModeBar': True,
+                                                'displaylogo': False,
+                                                'modeBarButtonsToRemove': ['select', 'lasso2d'],
+                                                'responsive': True,
+                                                'modeBarStyle': {
+                                                    'backgroundColor': 'transparent',
+                                                    'color': '#ffffff'
+                                                }
+                                            }
+                                        )
+                            
+                                    else:
+                                        st.warning("No historical data available for selected card")
+                                else:
+                                    st.warning("No historical data found for your cards")
+                            else:
+                                st.error("Unable to load historical data")
+                        render_card_history()
+                render_history_tab()
 
                 # Add targeted CSS
                 st.markdown("""
@@ -3062,3 +3411,96 @@ def format_table_html(df, display_columns):
     </div>
     """
     return html
+
+
+def is_admin(username):
+    """Admins are listed in the "admin_users" setting (list or comma separated string)"""
+    admin_users = get_setting("admin_users", [])
+    if isinstance(admin_users, str):
+        admin_users = admin_users.split(',')
+    return bool(username) and username.lower() in [user.strip().lower() for user in admin_users]
+
+
+def render_user_data_cache_panel():
+    """Memory used by the cached user frames, with per-user eviction"""
+    store = get_user_data_store()
+    stats = store.stats()
+    usage = store.usage()
+    st.markdown('<p class="category-header">User Data Cache</p>', unsafe_allow_html=True)
+    st.metric(
+        "Memory",
+        f"{stats['bytes'] / 1024 ** 2:,.2f} / {stats['max_bytes'] / 1024 ** 2:,.0f} MB",
+        help=f"{stats['entries']} users cached, {stats['evictions']} evicted"
+    )
+    if not usage:
+        return
+    st.dataframe(
+        pd.DataFrame([{
+            'User': row['key'],
+            'Size (MB)': round(row['bytes'] / 1024 ** 2, 2),
+            'Age': format_age(row['age'])
+        } for row in reversed(usage)]),
+        hide_index=True,
+        use_container_width=True
+    )
+    evict_user = st.selectbox("Evict user", [row['key'] for row in reversed(usage)], key='admin_evict_user')
+    if st.button("Evict", key='admin_evict'):
+        store.evict(evict_user)
+        st.rerun()
+
+
+def render_perf_panel():
+    """Admin-only sidebar panel with the stage timings and payload sizes of this run"""
+    if not perf.is_enabled() or not is_admin(st.session_state.get('username')):
+        return
+
+    # The sidebar is hidden for everyone else, bring it back for the panel
+    st.markdown("""
+        <style>
+        body section[data-testid="stSidebar"] {
+            display: block !important;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+    with st.sidebar:
+        st.markdown('<p class="category-header">Performance</p>', unsafe_allow_html=True)
+        st.metric("Script Run", f"{perf.elapsed() * 1000:,.0f} ms")
+        rows = perf.summary()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        else:
+            st.caption("No stages recorded in this run")
+
+        st.markdown('<p class="category-header">Load Coalescing</p>', unsafe_allow_html=True)
+        # Historical loads are coalesced by st.cache_resource's per-key lock, which keeps no counters
+        flights = {'User data': get_user_data_store().flight}
+        st.dataframe(
+            pd.DataFrame([{'Loader': name, **flight.stats()} for name, flight in flights.items()]).rename(columns={
+                'calls': 'Calls', 'executed': 'Loads', 'coalesced': 'Duplicates Avoided', 'hits': 'Hits'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        shared_cache = get_shared_cache()
+        if shared_cache is not None:
+            shared_stats = shared_cache.stats()
+            st.caption(
+                f"Shared cache: {shared_stats['hits']} hits, {shared_stats['loads']} loads, "
+                f"{shared_stats['errors']} errors"
+            )
+
+        render_user_data_cache_panel()
+
+        st.markdown('<p class="category-header">Data Source</p>', unsafe_allow_html=True)
+        sheets_stats = get_data_source().stats()
+        st.dataframe(
+            pd.DataFrame({'Counter': list(sheets_stats), 'Value': list(sheets_stats.values())}),
+            hide_index=True,
+            use_container_width=True
+        )
+
+
+# Rendered last so it covers every stage of the run
+render_perf_panel()
@@ -0,0 +1,245 @@
+"""
+End-to-end rerun benchmarks built on Streamlit's AppTest harness.
+
+    python benchmarks/run_app_benchmarks.py
+    python benchmarks/run_app_benchmarks.py --cards 10000 --years 3 --compare
+
+The app is loaded with a logged-in synthetic user (gspread and the service
+account are replaced by the local stand-ins from benchmarks/synthetic.py) and
+each typical widget interaction is timed as a full script run, together with
+the size of the element protos it produces. AppTest always reruns the whole
+script, so for widgets living in an st.fragment the time spent in that
+fragment (its perf stage) is reported too: that is what a browser rerun of
+the interaction costs. Runs are appended to benchmarks/history.json under the
+"app" suite.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import gspread
+from google.oauth2 import service_account
+from streamlit.testing.v1 import AppTest
+
+import historical
+import perf
+import presets
+from benchmarks import run_benchmarks, synthetic
+
+APP_PATH = os.path.join(REPO_DIR, 'app.py')
+
+# Column preset saved for the synthetic user before the run
+BENCHMARK_PRESET = 'benchmark'
+BENCHMARK_PRESET_COLUMNS = ['card_name', 'card_set', 'condition', 'rarity', 'efficient_price', 'total_efficient_value']
+
+
+def iter_elements(node):
+    """Every leaf element below an AppTest tree node"""
+    children = getattr(node, 'children', None)
+    if children is None:
+        yield node
+        return
+    for child in children.values():
+        yield from iter_elements(child)
+
+
+def message_bytes(at):
+    """Total serialized size of the element protos produced by the last run (main area and sidebar)"""
+    # AppTest does not expose the forward messages; the element protos are what they carry
+    return sum(
+        element.proto.ByteSize()
+        for block in (at.main, at.sidebar)
+        for element in iter_elements(block)
+        if getattr(element, 'proto', None) is not None
+    )
+
+
+class StageCollector(logging.Handler):
+    """Collects the perf stage timings logged by the app (AppTest runs it in another thread)"""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.stages = {}
+
+    def emit(self, record):
+        entry = json.loads(record.getMessage())
+        if 'stage' in entry:
+            self.stages[entry['stage']] = self.stages.get(entry['stage'], 0) + entry['seconds']
+
+
+def new_app(timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    # Stage timings are needed for the fragment figures
+    at.secrets['profiling'] = True
+    at.secrets['gcp_service_account'] = {}
+    at.secrets['sheets_setup_id'] = synthetic.SETUP_SHEET_ID
+    at.session_state['username_selected'] = True
+    at.session_state['username'] = 'benchmark'
+    return at
+
+
+def interactions():
+    """
+    (name, action, fragment stage) triples; each action takes the AppTest,
+    changes a widget and reruns. The stage is the perf stage of the fragment
+    holding the widget, None when the widget reruns the whole script.
+    """
+    def switch_metric(at):
+        selector = at.selectbox(key='price_metric_selector')
+        other = [option for option in selector.options if option != selector.value][0]
+        selector.set_value(other).run()
+
+    def apply_columns(at):
+        # The column selectors sit in a form: changes apply on submit
+        [button for button in at.button if button.label == 'Apply columns'][0].click().run()
+
+    def change_dimensions(at):
+        dimensions = at.multiselect(key='tab3_dimensions')
+        if 'rarity' in dimensions.value:
+            dimensions.unselect('rarity')
+        else:
+            dimensions.select('rarity')
+        apply_columns(at)
+
+    def change_metrics(at):
+        metrics = at.multiselect(key='tab3_metrics')
+        if 'purchase_price' in metrics.value:
+            metrics.unselect('purchase_price')
+        else:
+            metrics.select('purchase_price')
+        apply_columns(at)
+
+    def pick_preset(at):
+        selector = at.selectbox(key='tab3_preset')
+        selector.set_value('' if selector.value else BENCHMARK_PRESET).run()
+
+    def pick_card(at):
+        selector = at.selectbox(key='tab4_select')
+        others = [option for option in selector.options if option != selector.value]
+        selector.set_value(others[len(others) // 2]).run()
+
+    return [
+        ('rerun', lambda at: at.run(), None),
+        ('selected_metric', switch_metric, 'fragment.tab2.growth_scatter'),
+        ('tab3_dimensions', change_dimensions, 'fragment.tab3.inventory_grid'),
+        ('tab3_metrics', change_metrics, 'fragment.tab3.inventory_grid'),
+        ('tab3_preset', pick_preset, 'fragment.tab3.inventory_grid'),
+        ('tab4_select', pick_card, 'fragment.tab4.card_history'),
+    ]
+
+
+def run_case(n_cards, years, repeat, timeout):
+    case = f"cards={n_cards},years={years}"
+    results = []
+    print(case)
+
+    # The app opens historical.HISTORICAL_DB_PATH relative to the working directory
+    work_dir = os.path.join(run_benchmarks.DATA_DIR, f"app_{n_cards}_{years}y")
+    os.makedirs(work_dir, exist_ok=True)
+    db_path = os.path.join(work_dir, historical.HISTORICAL_DB_PATH)
+    if not os.path.exists(db_path):
+        print(f"  generating {db_path} ...")
+        synthetic.build_historical_db(db_path, n_cards, years)
+
+    presets.save_preset('benchmark', BENCHMARK_PRESET, BENCHMARK_PRESET_COLUMNS,
+                        os.path.join(work_dir, presets.PRESETS_PATH))
+
+    client = synthetic.FakeSheetsClient(n_cards)
+    collector = StageCollector()
+    perf.logger.addHandler(collector)
+    perf.logger.setLevel(logging.INFO)
+    perf.logger.propagate = False
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        with mock.patch.object(gspread, 'authorize', return_value=client), \
+                mock.patch.object(service_account.Credentials, 'from_service_account_info', return_value=object()):
+            at = new_app(timeout)
+
+            started = time.perf_counter()
+            at.run()
+            cold = time.perf_counter() - started
+            if at.exception:
+                raise RuntimeError(f"App raised: {at.exception[0].value}")
+            results.append({
+                'case': case, 'benchmark': 'cold_start', 'min_s': round(cold, 6),
+                'median_s': round(cold, 6), 'runs': 1, 'message_bytes': message_bytes(at)
+            })
+            print(f"  {'cold_start':<20} {cold * 1000:10.1f} ms   {message_bytes(at) / 1024:10.1f} KB")
+
+            for name, action, fragment in interactions():
+                timings = []
+                fragment_timings = []
+                for _ in range(repeat):
+                    collector.stages = {}
+                    started = time.perf_counter()
+                    action(at)
+                    timings.append(time.perf_counter() - started)
+                    if at.exception:
+                        raise RuntimeError(f"App raised during {name}: {at.exception[0].value}")
+                    if fragment is not None:
+                        fragment_timings.append(collector.stages.get(fragment, 0.0))
+                size = message_bytes(at)
+                result = {
+                    'case': case, 'benchmark': name, 'min_s': round(min(timings), 6),
+                    'median_s': round(statistics.median(timings), 6), 'runs': len(timings),
+                    'message_bytes': size
+                }
+                line = f"  {name:<20} {statistics.median(timings) * 1000:10.1f} ms   {size / 1024:10.1f} KB"
+                if fragment_timings:
+                    result['fragment'] = fragment
+                    result['fragment_median_s'] = round(statistics.median(fragment_timings), 6)
+                    line += f"   fragment {result['fragment_median_s'] * 1000:8.1f} ms"
+                results.append(result)
+                print(line)
+    finally:
+        os.chdir(previous_dir)
+        perf.logger.removeHandler(collector)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, nargs='+', default=[1000], help="portfolio sizes")
+    parser.add_argument('--years', type=int, nargs='+', default=[1], help="history lengths in years")
+    parser.add_argument('--repeat', type=int, default=3, help="reruns per interaction")
+    parser.add_argument('--timeout', type=float, default=300, help="AppTest script run timeout (seconds)")
+    parser.add_argument('--label', default=None, help="free text stored with the run")
+    parser.add_argument('--output', default=run_benchmarks.HISTORY_PATH, help="JSON history file")
+    parser.add_argument('--compare', action='store_true', help="compare with the previous app run in the history file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_cards in args.cards:
+        for years in args.years:
+            results.extend(run_case(n_cards, years, args.repeat, args.timeout))
+
+    run = {
+        'suite': 'app',
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': run_benchmarks.git_commit(),
+        'label': args.label,
+        'environment': run_benchmarks.environment(),
+        'results': results,
+    }
+    previous = run_benchmarks.previous_run(args.output, run['suite'])
+    run_benchmarks.append_run(args.output, run)
+    print(f"\nResults appended to {args.output}")
+
+    if args.compare and previous:
+        return 1 if run_benchmarks.compare_runs(previous, run) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
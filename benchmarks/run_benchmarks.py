@@ -0,0 +1,262 @@
+"""
+Reproducible performance benchmarks for the data loading and charting paths.
+
+    python benchmarks/run_benchmarks.py                        # 1k/10k cards, 1 year
+    python benchmarks/run_benchmarks.py --cards 1000 10000 100000 --years 1 3 5
+    python benchmarks/run_benchmarks.py --compare              # diff against the previous run
+
+Synthetic sheets are served by a local gspread stand-in and synthetic
+mtg_historical.db files are cached under benchmarks/.data. Every run is appended
+to benchmarks/history.json.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import pandas as pd
+import plotly.express as px
+
+import historical
+import perf
+import portfolio
+import sheets
+import sources
+from benchmarks import synthetic
+
+DATA_DIR = os.path.join(BENCHMARKS_DIR, '.data')
+HISTORY_PATH = os.path.join(BENCHMARKS_DIR, 'history.json')
+
+# Relative slowdown reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(func, repeat):
+    """Run func `repeat` times; return (timings, last result, perf stages of the last run)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        perf.start_run()
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    stages = {row['Stage']: row['Time (ms)'] for row in perf.summary() if row['Time (ms)'] is not None}
+    return timings, result, stages
+
+
+def portfolio_aggregates(df):
+    """The groupby/sort work done by the Portfolio Overview and Price Analysis tabs"""
+    set_values = df.groupby('card_set')['total_efficient_value'].sum()
+    set_amounts = df.groupby('card_set')['amount'].sum()
+    rarity = df.groupby('rarity')['card_name'].nunique()
+    reserved = df.groupby('reserved_list')['card_name'].nunique()
+    top_reserved = df[df['reserved_list'] == 'Yes'].nlargest(10, 'efficient_price')
+    top_gainers = df.nlargest(10, 'price_diff_d7')
+    top_losers = df.nsmallest(10, 'price_diff_d7')
+    return set_values, set_amounts, rarity, reserved, top_reserved, top_gainers, top_losers
+
+
+def build_figures(df, df_value):
+    """Build and serialize (as st.plotly_chart does) the heaviest charts"""
+    set_data = df.groupby('card_set', as_index=False)['total_efficient_value'].sum()
+    figures = [
+        px.treemap(set_data, path=['card_set'], values='total_efficient_value'),
+        px.histogram(df, x='efficient_price', nbins=5000),
+        px.scatter(df, x='efficient_price', y='price_diff_d7', hover_data={'card_name': True}),
+        px.line(df_value, x='date', y='total_value'),
+    ]
+    return sum(len(fig.to_json()) for fig in figures)
+
+
+def run_case(n_cards, years, repeat):
+    """Benchmark one (portfolio size, history length) combination"""
+    case = f"cards={n_cards},years={years}"
+    results = []
+
+    def record(name, timings, stages=None, **extra):
+        results.append({
+            'case': case,
+            'benchmark': name,
+            'min_s': round(min(timings), 6),
+            'median_s': round(statistics.median(timings), 6),
+            'runs': len(timings),
+            'stages_ms': stages or {},
+            **extra
+        })
+        print(f"  {name:<28} median {statistics.median(timings) * 1000:10.1f} ms   min {min(timings) * 1000:10.1f} ms")
+
+    print(f"{case}")
+    gateway = sheets.SheetsGateway(synthetic.FakeSheetsClient(n_cards))
+
+    timings, df, stages = measure(lambda: portfolio.load_user_data(gateway, synthetic.SETUP_SHEET_ID, 'benchmark'), repeat)
+    record('load_user_data', timings, stages, rows=len(df))
+
+    # Refresh through the delta sync once the first load is cached (no rows changed)
+    sheet_sync = portfolio.UserSheetSync()
+    sheet_sync.load(gateway, synthetic.SETUP_SHEET_ID, 'benchmark')
+    timings, _, stages = measure(lambda: sheet_sync.load(gateway, synthetic.SETUP_SHEET_ID, 'benchmark'), repeat)
+    record('sync_user_data', timings, stages)
+
+    # Same pipeline from local files (offline data source), parsing them every run
+    local_dir = os.path.join(DATA_DIR, f"local_{n_cards}")
+    setup_id = synthetic.write_local_sources(local_dir, n_cards)
+    timings, _, stages = measure(
+        lambda: portfolio.load_user_data(sources.LocalSheets(local_dir), setup_id, 'benchmark'), repeat
+    )
+    record('load_user_data_local', timings, stages)
+
+    timings, _, _ = measure(lambda: portfolio_aggregates(df), repeat)
+    record('portfolio_aggregates', timings)
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    db_path = os.path.join(DATA_DIR, f"historical_{n_cards}_{years}y.db")
+    if not os.path.exists(db_path):
+        print(f"  generating {db_path} ...")
+        synthetic.build_historical_db(db_path, n_cards, years)
+
+    def load_history():
+        conn = historical.connect(db_path)
+        try:
+            return historical.index_by_card(historical.load_history(conn))
+        finally:
+            conn.close()
+
+    timings, history_by_card, _ = measure(load_history, repeat)
+    record('load_historical_data', timings, rows=sum(len(frame) for frame in history_by_card.values()))
+    del history_by_card
+
+    holdings = df.groupby('card_name_set')['amount'].sum().fillna(0)
+
+    def value_history():
+        conn = historical.connect(db_path)
+        try:
+            return historical.portfolio_value_history(conn, holdings)
+        finally:
+            conn.close()
+
+    timings, df_value, _ = measure(value_history, repeat)
+    record('portfolio_value_history', timings, rows=len(df_value))
+
+    compare_cards = list(holdings.index[:12])
+
+    def compare_history():
+        conn = historical.connect(db_path)
+        try:
+            return historical.card_price_history(conn, compare_cards)
+        finally:
+            conn.close()
+
+    timings, _, _ = measure(compare_history, repeat)
+    record('card_price_history_12', timings)
+
+    timings, payload, _ = measure(lambda: build_figures(df, df_value), repeat)
+    record('build_figures', timings, payload_bytes=payload)
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARKS_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def load_history_file(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_run(path, run):
+    """Append a run to the JSON history file (written atomically)"""
+    runs = load_history_file(path)
+    runs.append(run)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(runs, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def previous_run(path, suite):
+    """Latest run of the same suite already in the history file"""
+    runs = [run for run in load_history_file(path) if run.get('suite', 'data') == suite]
+    return runs[-1] if runs else None
+
+
+def compare_runs(previous, current):
+    """Print the median change of every benchmark present in both runs"""
+    before = {(r['case'], r['benchmark']): r['median_s'] for r in previous['results']}
+    regressions = 0
+    print(f"\nCompared with {previous.get('commit')} ({previous['timestamp']}):")
+    for result in current['results']:
+        key = (result['case'], result['benchmark'])
+        if key not in before or not before[key]:
+            continue
+        change = result['median_s'] / before[key] - 1
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"  {key[0]:<22} {key[1]:<28} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, nargs='+', default=[1000, 10000], help="portfolio sizes")
+    parser.add_argument('--years', type=int, nargs='+', default=[1], help="history lengths in years")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark")
+    parser.add_argument('--label', default=None, help="free text stored with the run")
+    parser.add_argument('--output', default=HISTORY_PATH, help="JSON history file")
+    parser.add_argument('--compare', action='store_true', help="compare with the previous run in the history file")
+    args = parser.parse_args(argv)
+
+    # Collect stage timings without logging every record
+    perf.configure(True)
+    perf.logger.setLevel('WARNING')
+
+    results = []
+    for n_cards in args.cards:
+        for years in args.years:
+            results.extend(run_case(n_cards, years, args.repeat))
+
+    run = {
+        'suite': 'data',
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'label': args.label,
+        'environment': environment(),
+        'results': results,
+    }
+
+    previous = previous_run(args.output, run['suite'])
+    append_run(args.output, run)
+    print(f"\nResults appended to {args.output}")
+
+    if args.compare and previous:
+        return 1 if compare_runs(previous, run) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
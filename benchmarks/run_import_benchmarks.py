@@ -0,0 +1,133 @@
+"""
+Startup benchmarks: what a cold Streamlit process pays before the login form shows.
+
+    python benchmarks/run_import_benchmarks.py
+    python benchmarks/run_import_benchmarks.py --repeat 5 --compare
+
+Every heavy dependency of app.py is imported in a fresh interpreter under
+`python -X importtime` and its cumulative import time recorded. Then the login
+page is rendered in a fresh process (AppTest, nobody logged in) to time the
+first script run, which includes app.py's own imports, and to list the heavy
+modules it loaded (none of them should be needed for the login form). Runs are
+appended to benchmarks/history.json under the "imports" suite.
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks import run_benchmarks
+
+APP_PATH = os.path.join(REPO_DIR, 'app.py')
+
+# Imported by app.py where they are first used, not at module load
+HEAVY_MODULES = [
+    'gspread', 'google.oauth2.service_account', 'plotly.express', 'plotly.graph_objects', 'st_aggrid'
+]
+# Always needed, measured for reference
+BASE_MODULES = ['streamlit', 'pandas', 'numpy']
+
+# Run in a fresh interpreter: first run of the logged-out app
+LOGIN_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+started = time.perf_counter()
+at.run()
+seconds = time.perf_counter() - started
+loaded = [name for name in json.loads(sys.argv[2]) if name in sys.modules and name not in before]
+print(json.dumps({'seconds': seconds, 'loaded': loaded, 'errors': len(at.exception)}))
+"""
+
+
+def import_time(module):
+    """Cumulative import time (s) of module in a fresh interpreter, as reported by -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, cwd=REPO_DIR, check=True
+    )
+    # import time: self [us] | cumulative | imported package
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def login_first_run():
+    """(seconds, heavy modules loaded, exceptions) of the first logged-out run of app.py"""
+    result = subprocess.run(
+        [sys.executable, '-c', LOGIN_PROBE, APP_PATH, json.dumps(HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=REPO_DIR, check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return probe['seconds'], probe['loaded'], probe['errors']
+
+
+def run_case(repeat):
+    results = []
+
+    def record(name, timings, **extra):
+        results.append({
+            'case': 'cold',
+            'benchmark': name,
+            'min_s': round(min(timings), 6),
+            'median_s': round(statistics.median(timings), 6),
+            'runs': len(timings),
+            'stages_ms': {},
+            **extra
+        })
+        print(f"  {name:<40} median {statistics.median(timings) * 1000:10.1f} ms   min {min(timings) * 1000:10.1f} ms")
+
+    print("cold process")
+    for module in BASE_MODULES + HEAVY_MODULES:
+        timings = [import_time(module) for _ in range(repeat)]
+        if None in timings:
+            print(f"  {module}: not importable, skipped")
+            continue
+        record(f"import.{module}", timings)
+
+    runs = [login_first_run() for _ in range(repeat)]
+    loaded = runs[-1][1]
+    record('login_first_run', [seconds for seconds, _, _ in runs], heavy_modules_loaded=loaded, exceptions=runs[-1][2])
+    if loaded:
+        print(f"  heavy modules loaded by the login page: {', '.join(loaded)}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help="fresh processes per benchmark")
+    parser.add_argument('--label', default=None, help="free text stored with the run")
+    parser.add_argument('--output', default=run_benchmarks.HISTORY_PATH, help="JSON history file")
+    parser.add_argument('--compare', action='store_true', help="compare with the previous run in the history file")
+    args = parser.parse_args(argv)
+
+    run = {
+        'suite': 'imports',
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': run_benchmarks.git_commit(),
+        'label': args.label,
+        'environment': run_benchmarks.environment(),
+        'results': run_case(args.repeat),
+    }
+
+    previous = run_benchmarks.previous_run(args.output, run['suite'])
+    run_benchmarks.append_run(args.output, run)
+    print(f"\nResults appended to {args.output}")
+
+    if args.compare and previous:
+        return 1 if run_benchmarks.compare_runs(previous, run) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
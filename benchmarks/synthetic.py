@@ -0,0 +1,210 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import historical
+import schema
+
+
+# Synthetic data in the shape of the real Google Sheets / SQLite sources.
+# Everything is seeded so two runs on the same size produce identical data.
+SETS = [
+    'Alpha', 'Beta', 'Unlimited', 'Arabian Nights', 'Antiquities', 'Legends', 'The Dark',
+    'Fallen Empires', 'Ice Age', 'Homelands', 'Alliances', 'Mirage', 'Visions', 'Weatherlight',
+    'Tempest', 'Stronghold', 'Exodus', "Urza's Saga", "Urza's Legacy", "Urza's Destiny"
+]
+RARITIES = ['Common', 'Uncommon', 'Rare', 'Mythic', 'Special']
+CONDITIONS = ['MT', 'NM', 'EX', 'GD', 'LP', 'PL', 'PO']
+LANGUAGES = ['English', 'German', 'French', 'Italian', 'Spanish', 'Japanese']
+
+USER_COLUMNS = schema.sheet_columns()
+GLOSSARY_COLUMNS = [
+    'card_name', 'card_set', 'collection_number', 'rarity', 'reserved_list',
+    'set_release_date', 'frame_era', 'set_type'
+]
+SETUP_SHEET_ID = 'synthetic-setup'
+USER_SHEET_ID = 'synthetic-user'
+SNAPSHOT_DATE = pd.Timestamp('2026-01-01')
+
+
+def _euro(values):
+    """Format floats the way the sheets do: '1.234,56 €'"""
+    return [f"{v:,.2f} €".replace(',', 'X').replace('.', ',').replace('X', '.') for v in values]
+
+
+def _percent(values):
+    return [f"{v:.1f}%" for v in values]
+
+
+def card_frame(n_cards, seed=0):
+    """Card identities and current prices for a synthetic portfolio of n_cards rows"""
+    rng = np.random.default_rng(seed)
+    sets = rng.choice(SETS, n_cards)
+    return pd.DataFrame({
+        'card_name': [f"Synthetic Card {i}" for i in range(n_cards)],
+        'card_set': sets,
+        'foil': rng.choice(['Yes', 'No'], n_cards, p=[0.2, 0.8]),
+        'amount': rng.integers(1, 5, n_cards),
+        'price': np.round(rng.lognormal(2.5, 1.5, n_cards), 2),
+    })
+
+
+def user_sheet_values(n_cards, seed=0):
+    """get_all_values() payload of a user output sheet (header + rows, all strings)"""
+    rng = np.random.default_rng(seed + 1)
+    cards = card_frame(n_cards, seed)
+    price = cards['price'].to_numpy()
+    amount = cards['amount'].to_numpy()
+    last_sold = SNAPSHOT_DATE - pd.to_timedelta(rng.integers(0, 60, n_cards), unit='D')
+    columns = {
+        'amount': amount.astype(str),
+        'card_name': cards['card_name'],
+        'card_set': cards['card_set'],
+        'language': rng.choice(LANGUAGES, n_cards),
+        'condition': rng.choice(CONDITIONS, n_cards),
+        'foil': cards['foil'],
+        'signed': rng.choice(['Yes', 'No'], n_cards, p=[0.05, 0.95]),
+        'country': rng.choice(['DE', 'FR', 'IT', 'ES'], n_cards),
+        'purchase_price': np.where(rng.random(n_cards) < 0.3, '', _euro(price * rng.uniform(0.5, 1.2, n_cards))),
+        'from_price': _euro(price * 0.8),
+        'trend_price': _euro(price),
+        'ms_trend_price': _euro(price * 1.02),
+        'efficient_price': _euro(price),
+        'conservative_price': _euro(price * 0.9),
+        'value_price': _euro(price * 1.1),
+        'alerts': rng.choice(['L', 'U', '0', '1', '3', 'N/A'], n_cards),
+        'notes': '',
+        'date': SNAPSHOT_DATE.strftime('%Y-%m-%d'),
+        'last_sold_date': last_sold.strftime('%Y-%m-%d'),
+        'listed_price': _euro(price * 1.05),
+        'listed_stock': np.where(rng.random(n_cards) < 0.5, 'N/A', rng.integers(0, 5, n_cards).astype(str)),
+        'total_stock': rng.integers(0, 500, n_cards).astype(str),
+        'country_stock': rng.integers(0, 50, n_cards).astype(str),
+        'price_growth': _percent(rng.normal(10, 40, n_cards)),
+        'equity_in_country': _percent(rng.uniform(0, 100, n_cards)),
+        'equity_on_cardmarket': _percent(rng.uniform(0, 100, n_cards)),
+        'total_efficient_value': _euro(price * amount),
+        'total_conservative_value': _euro(price * amount * 0.9),
+        'price_diff_d7': _percent(rng.normal(0, 8, n_cards)),
+        'purchase_price_diff': '',
+    }
+    df = pd.DataFrame(columns)[USER_COLUMNS]
+    return [USER_COLUMNS] + df.astype(str).values.tolist()
+
+
+def glossary_sheet_values(n_cards, seed=0):
+    """get_all_values() payload of the glossary sheet covering every synthetic card"""
+    rng = np.random.default_rng(seed + 2)
+    cards = card_frame(n_cards, seed).drop_duplicates(['card_name', 'card_set'])
+    n = len(cards)
+    df = pd.DataFrame({
+        'card_name': cards['card_name'],
+        'card_set': cards['card_set'],
+        'collection_number': np.arange(n).astype(str),
+        'rarity': rng.choice(RARITIES, n),
+        'reserved_list': rng.choice(['Yes', 'No'], n, p=[0.3, 0.7]),
+        'set_release_date': cards['card_set'].map({s: f"{1993 + i // 4}-0{1 + i % 4}-01" for i, s in enumerate(SETS)}),
+        'frame_era': 'Old',
+        'set_type': 'expansion',
+    })[GLOSSARY_COLUMNS]
+    return [GLOSSARY_COLUMNS] + df.astype(str).values.tolist()
+
+
+def setup_sheet_values(username='benchmark'):
+    return [
+        ['user', 'password', 'mtg_output_file'],
+        [username, 'benchmark', f"https://docs.google.com/spreadsheets/d/{USER_SHEET_ID}/edit"],
+    ]
+
+
+def card_name_sets(n_cards, seed=0):
+    """card_name_set keys as load_user_data builds them"""
+    cards = card_frame(n_cards, seed)
+    finish = np.where(cards['foil'] == 'Yes', 'Foil', 'Regular')
+    return (cards['card_name'] + ' - ' + cards['card_set'] + ' - ' + finish).tolist()
+
+
+def build_historical_db(db_path, n_cards, years, seed=0, chunk_days=30):
+    """
+    Write a mtg_historical.db with one random-walk price per card per day
+    over `years` years ending on the snapshot date.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = np.random.default_rng(seed + 3)
+    cards = np.array(card_name_sets(n_cards, seed), dtype=object)
+    start_price = card_frame(n_cards, seed)['price'].to_numpy()
+    dates = pd.date_range(end=SNAPSHOT_DATE, periods=int(365 * years), freq='D').strftime('%Y-%m-%d')
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"""
+        CREATE TABLE {historical.HISTORICAL_TABLE} (
+            date TEXT,
+            card_name_set TEXT,
+            efficient_price REAL,
+            trend_price REAL
+        )
+    """)
+    price = start_price.copy()
+    with conn:
+        for first in range(0, len(dates), chunk_days):
+            chunk_dates = dates[first:first + chunk_days]
+            rows = []
+            for day in chunk_dates:
+                price = np.maximum(price * rng.normal(1.0, 0.01, n_cards), 0.02)
+                rounded = np.round(price, 2).tolist()
+                rows.extend(zip([day] * n_cards, cards.tolist(), rounded, rounded))
+            conn.executemany(f"INSERT INTO {historical.HISTORICAL_TABLE} VALUES (?, ?, ?, ?)", rows)
+    historical.ensure_indexes(conn)
+    conn.close()
+    return db_path
+
+
+def write_local_sources(directory, n_cards, seed=0, username='benchmark'):
+    """
+    The synthetic sheets as files for sources.LocalSheets: setup.csv, a CSV user
+    portfolio and a Parquet glossary. Returns the setup sheet id to use.
+    """
+    os.makedirs(directory, exist_ok=True)
+    user_file = f"{USER_SHEET_ID}_{n_cards}.csv"
+    setup = setup_sheet_values(username)
+    setup[1][2] = user_file
+    for name, values in [('setup.csv', setup), (user_file, user_sheet_values(n_cards, seed))]:
+        pd.DataFrame(values[1:], columns=values[0]).to_csv(os.path.join(directory, name), index=False)
+    glossary = glossary_sheet_values(n_cards, seed)
+    pd.DataFrame(glossary[1:], columns=glossary[0]).to_parquet(os.path.join(directory, 'glossary.parquet'))
+    return 'setup'
+
+
+class FakeSheetsClient:
+    """
+    Local stand-in for an authorized gspread client: serves the synthetic setup,
+    user and glossary sheets without any network access. Like gspread.Client it
+    exposes values.batchGet through its http_client.
+    """
+
+    def __init__(self, n_cards, seed=0, username='benchmark'):
+        self.sheets = {
+            SETUP_SHEET_ID: setup_sheet_values(username),
+            USER_SHEET_ID: user_sheet_values(n_cards, seed),
+        }
+        self.glossary = glossary_sheet_values(n_cards, seed)
+        self.requests = 0
+        self.http_client = self
+
+    def fetch_sheet_metadata(self, id, params=None):
+        self.requests += 1
+        rows = len(self.sheets.get(id, self.glossary))
+        return {'sheets': [{'properties': {'gridProperties': {'rowCount': rows}}}]}
+
+    def values_batch_get(self, id, ranges, params=None):
+        self.requests += 1
+        # Any other key is the (hard-coded) glossary sheet; ranges are row ranges ('1:5000')
+        values = self.sheets.get(id, self.glossary)
+        value_ranges = []
+        for name in ranges:
+            first, last = (int(row) for row in name.split(':'))
+            value_ranges.append({'range': name, 'values': [list(row) for row in values[first - 1:last]]})
+        return {'valueRanges': value_ranges}
@@ -0,0 +1,432 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, workers may load the same key twice
+    fcntl = None
+
+
+logger = logging.getLogger('mindseeker.caching')
+
+# An immutable cached value and the wall-clock time it was fetched at
+Snapshot = namedtuple('Snapshot', ['value', 'fetched_at'])
+
+
+class StaleWhileRevalidate:
+    """
+    Per-key cache that always answers from the last snapshot.
+    Only the very first load of a key blocks (concurrent first loads of the
+    same key share one call); once a snapshot is older than max_age a
+    background thread fetches a fresh one and swaps it in atomically, while
+    callers keep getting the stale snapshot in the meantime.
+
+    With max_bytes set, sizer(key, value) gives the memory held for each key and
+    the least recently read keys are evicted once the total goes over budget
+    (the key just stored is always kept). on_evict(key) is called for every
+    evicted key, and for a key whose background refresh finished after it was
+    evicted, so loaders can drop their own per-key state.
+
+    A loader may return a Snapshot instead of a bare value to carry the time
+    its data was actually fetched (e.g. when it comes from a shared tier).
+    prefetch() starts a first load in the background; a get() arriving while
+    it runs waits for it instead of loading again.
+    """
+
+    def __init__(self, loader, max_age, name='swr', max_bytes=None, sizer=None, on_evict=None):
+        self._loader = loader
+        self.max_age = max_age
+        self.name = name
+        self.max_bytes = max_bytes
+        self._sizer = sizer
+        self._on_evict = on_evict
+        self._snapshots = OrderedDict()
+        self._sizes = {}
+        self._evictions = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.flight = SingleFlight(name=name)
+
+    def get(self, key):
+        """Return the Snapshot for key, loading it synchronously if there is none yet"""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+
+        if snapshot is None:
+            return self.flight.do(key, self._load_missing, key)
+
+        if self.age(snapshot) > self.max_age:
+            self.refresh_in_background(key)
+        return snapshot
+
+    def _load(self, key, *args):
+        snapshot = self._snapshot(self._loader(key, *args))
+        self._store(key, snapshot)
+        return snapshot
+
+    def _load_missing(self, key, *args):
+        # Run as the flight leader: a load that finished between the caller's
+        # own check and this call has already stored its snapshot
+        snapshot = self.peek(key)
+        if snapshot is not None:
+            return snapshot
+        return self._load(key, *args)
+
+    def peek(self, key):
+        """The Snapshot of key if there is one, without loading or refreshing it"""
+        with self._lock:
+            return self._snapshots.get(key)
+
+    def prefetch(self, key, *args):
+        """
+        Load key on a background thread unless it is cached already; extra args
+        are passed to the loader. Returns the thread, or None when there was nothing to do.
+        """
+        if self.peek(key) is not None:
+            return None
+        thread = threading.Thread(
+            target=self._prefetch,
+            args=(key, *args),
+            name=f"{self.name}-prefetch",
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _prefetch(self, key, *args):
+        try:
+            self.flight.do(key, self._load_missing, key, *args)
+        except Exception:
+            # The next get() loads it again and reports the error to the user
+            logger.exception("Prefetch of %r failed", key)
+
+    def _snapshot(self, value):
+        return value if isinstance(value, Snapshot) else Snapshot(value, time.time())
+
+    def _store(self, key, snapshot):
+        """Swap in the snapshot of key (a single assignment) and evict over budget"""
+        size = self._sizer(key, snapshot.value) if self._sizer is not None else 0
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            self._sizes[key] = size
+            evicted = self._evict_over_budget(keep=key)
+        for evicted_key in evicted:
+            self._evicted(evicted_key)
+
+    def _evict_over_budget(self, keep):
+        # Called with the lock held
+        evicted = []
+        if self.max_bytes is None:
+            return evicted
+        while sum(self._sizes.values()) > self.max_bytes:
+            oldest = next(iter(self._snapshots))
+            if oldest == keep:
+                break
+            self._snapshots.pop(oldest)
+            self._sizes.pop(oldest, None)
+            self._evictions += 1
+            evicted.append(oldest)
+        return evicted
+
+    def _evicted(self, key):
+        logger.info("Evicted %r from %s", key, self.name)
+        if self._on_evict is not None:
+            self._on_evict(key)
+
+    def age(self, snapshot):
+        return time.time() - snapshot.fetched_at
+
+    def is_refreshing(self, key):
+        with self._lock:
+            return key in self._refreshing
+
+    def refresh_in_background(self, key):
+        """Start a background refresh of key unless one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+        thread = threading.Thread(
+            target=self._refresh,
+            args=(key,),
+            name=f"{self.name}-refresh",
+            daemon=True
+        )
+        thread.start()
+        return True
+
+    def _refresh(self, key):
+        try:
+            value = self._loader(key)
+        except Exception:
+            # Keep serving the previous snapshot; the next stale read retries
+            logger.exception("Background refresh of %r failed", key)
+            with self._lock:
+                self._refreshing.discard(key)
+            return
+        with self._lock:
+            self._refreshing.discard(key)
+            evicted = key not in self._snapshots
+        if evicted:
+            # Evicted while refreshing: keep it out, and the state the loader
+            # kept for it too
+            if self._on_evict is not None:
+                self._on_evict(key)
+            return
+        # Single assignment: readers see either the old or the new snapshot
+        self._store(key, self._snapshot(value))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._snapshots.pop(key, None)
+            self._sizes.pop(key, None)
+
+    def evict(self, key):
+        """Drop key and its loader state; the next get() loads it again"""
+        with self._lock:
+            present = self._snapshots.pop(key, None) is not None
+            self._sizes.pop(key, None)
+            if present:
+                self._evictions += 1
+        if present:
+            self._evicted(key)
+        return present
+
+    def usage(self):
+        """Memory held by the cached snapshots: one row per key, least recently read first"""
+        with self._lock:
+            return [
+                {'key': key, 'bytes': self._sizes.get(key, 0), 'age': self.age(snapshot)}
+                for key, snapshot in self._snapshots.items()
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._snapshots),
+                'bytes': sum(self._sizes.values()),
+                'max_bytes': self.max_bytes,
+                'evictions': self._evictions,
+            }
+
+
+
+class _Call:
+    """An in-flight SingleFlight call; followers wait on `done`"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    function, callers arriving while it is in flight wait and share its result
+    (or exception). With ttl > 0 a finished result is also handed to callers
+    arriving within ttl seconds. Shared results must not be mutated.
+    """
+
+    def __init__(self, ttl=0, name='single-flight'):
+        self.ttl = ttl
+        self.name = name
+        self._calls = {}
+        self._results = {}
+        self._stats = {'calls': 0, 'executed': 0, 'coalesced': 0, 'hits': 0}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), sharing the call with concurrent callers of the same key"""
+        with self._lock:
+            self._stats['calls'] += 1
+            result = self._results.get(key)
+            if result is not None and time.time() - result.fetched_at <= self.ttl:
+                self._stats['hits'] += 1
+                return result.value
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['executed'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = func(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.ttl > 0:
+                    now = time.time()
+                    self._results = {
+                        k: r for k, r in self._results.items() if now - r.fetched_at <= self.ttl
+                    }
+                    self._results[key] = Snapshot(call.value, now)
+            call.done.set()
+        return call.value
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+class SharedFrame:
+    """
+    Read-only handle on a DataFrame shared by every session of the process.
+    The frame itself is never handed out: view() returns a shallow copy whose
+    writes (new columns, edited values) stay private to the caller thanks to
+    pandas 3 copy-on-write, so nothing is copied until someone actually writes.
+    nbytes includes the contents of object columns; it is measured on first
+    access, as only cache sizers need it.
+    """
+
+    __slots__ = ('_frame', '_nbytes')
+
+    def __init__(self, frame):
+        object.__setattr__(self, '_frame', frame.copy(deep=False))
+        object.__setattr__(self, '_nbytes', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SharedFrame is read-only, take a view() and modify that")
+
+    def __len__(self):
+        return len(self._frame)
+
+    @property
+    def columns(self):
+        return self._frame.columns
+
+    @property
+    def nbytes(self):
+        if self._nbytes is None:
+            object.__setattr__(self, '_nbytes', int(self._frame.memory_usage(index=True, deep=True).sum()))
+        return self._nbytes
+
+    def view(self):
+        """A DataFrame over the shared data that can be freely modified"""
+        return self._frame.copy(deep=False)
+
+
+class DiskTier:
+    """
+    Cache tier shared by every worker process of the host: DataFrames are kept
+    as Arrow IPC (feather) files in directory, named after a hash of their key.
+    Files are written under a temporary name and renamed into place, so readers
+    never see a partial file. A lock file per key makes a single process load a
+    missing or expired key while the others wait for it and then read its file.
+    Data and lock files untouched for `retention` seconds are pruned on every
+    write. Needs pyarrow.
+    """
+
+    def __init__(self, directory, name='shared', retention=24 * 3600):
+        self.directory = directory
+        self.name = name
+        self.retention = retention
+        self._stats = {'hits': 0, 'loads': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{self.name}-{digest}{suffix}")
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def read(self, key, max_age=None):
+        """Snapshot of key (fetched_at = file time) or None when missing, expired or unreadable"""
+        path = self._path(key, '.arrow')
+        try:
+            fetched_at = os.path.getmtime(path)
+            if max_age is not None and time.time() - fetched_at > max_age:
+                return None
+            return Snapshot(pd.read_feather(path), fetched_at)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Unreadable shared cache file for %r", key)
+            self._count('errors')
+            return None
+
+    def write(self, key, frame):
+        """Atomically replace the file of key; failures are logged, the caller keeps its frame"""
+        path = self._path(key, '.arrow')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            frame.to_feather(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            logger.exception("Could not write shared cache file for %r", key)
+            self._count('errors')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.prune()
+
+    def prune(self):
+        cutoff = time.time() - self.retention
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(f"{self.name}-") and entry.name.endswith(('.arrow', '.lock')):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def lock(self, key):
+        """Exclusive lock on key across processes (a no-op without fcntl)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(key, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Lock files in use stay young, so prune() only drops abandoned ones
+            os.utime(lock_file.fileno())
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_load(self, key, loader, max_age=None):
+        """
+        Snapshot of key from the shared files, calling loader() and storing its
+        frame when there is none younger than max_age
+        """
+        snapshot = self.read(key, max_age)
+        if snapshot is None:
+            with self.lock(key):
+                # Another process may have loaded it while we waited for the lock
+                snapshot = self.read(key, max_age)
+                if snapshot is None:
+                    self._count('loads')
+                    frame = loader()
+                    self.write(key, frame)
+                    return Snapshot(frame, time.time())
+        self._count('hits')
+        return snapshot
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,53 @@
+"""
+Compact old history in mtg_historical.db into weekly and monthly tiers.
+
+    python compact_history.py
+    python compact_history.py --daily-days 180 --weekly-days 730 --vacuum
+
+Days older than --daily-days are rolled up into one weekly OHLC row per card
+(mtg_card_prices_weekly) and weeks older than --weekly-days into monthly rows
+(mtg_card_prices_monthly). The app reads every tier transparently, so long date
+ranges keep working at a coarser resolution. Running it again only touches data
+that has aged past a cutoff since the previous run.
+"""
+import argparse
+import os
+import sys
+import time
+
+import historical
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=historical.HISTORICAL_DB_PATH, help="historical database path")
+    parser.add_argument('--daily-days', type=int, default=365, help="days kept at daily resolution")
+    parser.add_argument('--weekly-days', type=int, default=3 * 365, help="days kept at weekly resolution or finer")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM the database afterwards to reclaim disk space")
+    args = parser.parse_args(argv)
+
+    if args.weekly_days < args.daily_days:
+        parser.error("--weekly-days must be at least --daily-days")
+
+    started = time.perf_counter()
+    size_before = os.path.getsize(args.db)
+    conn = historical.connect(args.db)
+    try:
+        moved = historical.compact_history(conn, args.daily_days, args.weekly_days)
+        # Databases written by the ingestion job carry summaries to keep in sync
+        if (moved['weekly'] or moved['monthly']) and historical.table_exists(conn, historical.CARD_SUMMARY_TABLE):
+            historical.rebuild_summaries(conn)
+        if args.vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    print(f"Daily rows rolled into weeks: {moved['weekly']:,}")
+    print(f"Weekly rows rolled into months: {moved['monthly']:,}")
+    print(f"Database size: {size_before / 2**20:.1f} MB -> {os.path.getsize(args.db) / 2**20:.1f} MB")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
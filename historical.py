@@ -0,0 +1,605 @@
+import os
+import sqlite3
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Historical prices database (one row per card per day)
+HISTORICAL_DB_PATH = 'mtg_historical.db'
+HISTORICAL_TABLE = 'mtg_card_prices_historical'
+
+# Retention tiers written by compact_history(): older days are rolled up into
+# weekly and then monthly OHLC rows, one per card and period
+WEEKLY_TABLE = 'mtg_card_prices_weekly'
+MONTHLY_TABLE = 'mtg_card_prices_monthly'
+
+# Where a tier keeps its date and price; aggregated tiers are plotted at the
+# end of their period, with their closing price, so every card of a period
+# shares one date whatever its last trading day
+HistorySource = namedtuple('HistorySource', ['table', 'date_column', 'price_column'])
+DAILY_SOURCE = HistorySource(HISTORICAL_TABLE, 'date', 'efficient_price')
+TIER_SOURCES = [
+    HistorySource(WEEKLY_TABLE, 'period_end', 'close'),
+    HistorySource(MONTHLY_TABLE, 'period_end', 'close'),
+]
+
+# Last day of a tier's period, from its period_start
+TIER_PERIOD_END = {
+    WEEKLY_TABLE: "date(period_start, '+6 days')",
+    MONTHLY_TABLE: "date(period_start, '+1 month', '-1 day')",
+}
+
+
+def connect(db_path=HISTORICAL_DB_PATH):
+    """Open a connection to the historical prices database"""
+    return sqlite3.connect(db_path)
+
+
+def ensure_indexes(conn):
+    """Create the covering index used by per-card and portfolio lookups, plus a date index for range scans"""
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{HISTORICAL_TABLE}_card_date
+        ON {HISTORICAL_TABLE} (card_name_set, date, efficient_price)
+    """)
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{HISTORICAL_TABLE}_date
+        ON {HISTORICAL_TABLE} (date)
+    """)
+    conn.commit()
+
+
+def date_filter(start_date, column='date'):
+    """SQL condition and parameters restricting rows to dates >= start_date (no-op for None)"""
+    if start_date is None:
+        return "1 = 1", []
+    return f"{column} >= ?", [start_date]
+
+
+def range_start(latest_date, days):
+    """
+    First date (ISO string) of a window of `days` days ending at latest_date.
+    Returns None for an unbounded window.
+    """
+    if days is None or latest_date is None or pd.isna(latest_date):
+        return None
+    return (latest_date - pd.Timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+
+def table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def history_sources(conn, start_date=None):
+    """
+    Tiers to read for a range starting at start_date. The compacted tiers only
+    hold data older than the oldest daily row, so they are skipped whenever the
+    range is covered by the daily table alone.
+    """
+    tiers = [source for source in TIER_SOURCES if table_exists(conn, source.table)]
+    if not tiers:
+        return [DAILY_SOURCE]
+    oldest_daily = conn.execute(f"SELECT MIN(date) FROM {HISTORICAL_TABLE}").fetchone()[0]
+    if start_date is not None and oldest_daily is not None and start_date >= oldest_daily:
+        return [DAILY_SOURCE]
+    return [DAILY_SOURCE] + tiers
+
+
+def source_columns(source, columns, alias=''):
+    """SELECT list exposing a tier under the daily table's column names"""
+    prefix = f"{alias}." if alias else ''
+    selected = []
+    for col in columns:
+        if col == 'date':
+            selected.append(f"{prefix}{source.date_column} AS date")
+        elif col == 'efficient_price':
+            selected.append(f"{prefix}{source.price_column} AS efficient_price")
+        elif col == 'card_name_set' or source is DAILY_SOURCE:
+            selected.append(f"{prefix}{col} AS {col}")
+        else:
+            selected.append(f"NULL AS {col}")
+    return ', '.join(selected)
+
+
+def latest_history_date(conn):
+    """Most recent date in the historical table (index lookup)"""
+    latest = conn.execute(f"SELECT MAX(date) FROM {HISTORICAL_TABLE}").fetchone()[0]
+    return pd.to_datetime(latest, errors='coerce')
+
+
+def load_history(conn, start_date=None):
+    """Read the price history (all tiers) from start_date onwards, with dates parsed once"""
+    columns = table_columns(conn)
+    parts, params = [], []
+    for source in history_sources(conn, start_date):
+        condition, condition_params = date_filter(start_date, source.date_column)
+        parts.append(f"SELECT {source_columns(source, columns)} FROM {source.table} WHERE {condition}")
+        params += condition_params
+    query = f"""
+        {' UNION ALL '.join(parts)}
+        ORDER BY date, card_name_set
+    """
+    df_historical = pd.read_sql_query(query, conn, params=params)
+    df_historical['date'] = pd.to_datetime(df_historical['date'], errors='coerce')
+    return df_historical
+
+
+def history_watermark(db_path=HISTORICAL_DB_PATH):
+    """
+    Cheap fingerprint of the database contents, used as a cache key.
+    Any write to the database (or its WAL file) changes the watermark.
+    """
+    watermark = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+            watermark.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            watermark.append(None)
+    return tuple(watermark)
+
+
+def portfolio_value_history(conn, holdings, start_date=None):
+    """
+    Aggregate the daily value of a portfolio in SQL.
+    holdings maps card_name_set -> amount held; the result has one row per date
+    (from start_date onwards) with the total value and the number of holdings
+    that had a price that day.
+    """
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS portfolio_holdings (
+            card_name_set TEXT PRIMARY KEY,
+            amount REAL
+        )
+    """)
+    conn.execute("DELETE FROM portfolio_holdings")
+    conn.executemany(
+        "INSERT INTO portfolio_holdings (card_name_set, amount) VALUES (?, ?)",
+        ((card, float(amount)) for card, amount in holdings.items())
+    )
+
+    # Drive each join from the (small) holdings table so every card is an index seek
+    parts, params = [], []
+    for source in history_sources(conn, start_date):
+        condition, condition_params = date_filter(start_date, f"h.{source.date_column}")
+        parts.append(f"""
+            SELECT h.{source.date_column} AS date,
+                   h.{source.price_column} * p.amount AS value,
+                   h.{source.price_column} AS price
+            FROM portfolio_holdings p
+            CROSS JOIN {source.table} h
+            WHERE h.card_name_set = p.card_name_set AND {condition}
+        """)
+        params += condition_params
+    query = f"""
+        SELECT date,
+               SUM(value) AS total_value,
+               COUNT(price) AS cards_priced
+        FROM ({' UNION ALL '.join(parts)})
+        GROUP BY date
+        ORDER BY date
+    """
+    df_value = pd.read_sql_query(query, conn, params=params)
+    df_value['date'] = pd.to_datetime(df_value['date'], errors='coerce')
+    return df_value
+
+
+def card_price_history(conn, cards, start_date=None, batch_size=500):
+    """
+    Fetch the price history of several cards with batched IN (...) queries.
+    Each batch is resolved through the (card_name_set, date) index.
+    """
+    cards = list(cards)
+    sources = history_sources(conn, start_date)
+    frames = []
+    for start in range(0, len(cards), batch_size):
+        batch = cards[start:start + batch_size]
+        placeholders = ', '.join('?' * len(batch))
+        parts, params = [], []
+        for source in sources:
+            condition, condition_params = date_filter(start_date, source.date_column)
+            parts.append(f"""
+                SELECT {source_columns(source, ['date', 'card_name_set', 'efficient_price'])}
+                FROM {source.table}
+                WHERE card_name_set IN ({placeholders}) AND {condition}
+            """)
+            params += batch + condition_params
+        query = f"""
+            {' UNION ALL '.join(parts)}
+            ORDER BY card_name_set, date
+        """
+        frames.append(pd.read_sql_query(query, conn, params=params))
+
+    if not frames:
+        return pd.DataFrame(columns=['date', 'card_name_set', 'efficient_price'])
+
+    df_cards = pd.concat(frames, ignore_index=True)
+    df_cards['date'] = pd.to_datetime(df_cards['date'], errors='coerce')
+    return df_cards
+
+
+def rebase_to_100(df_cards, value_column='efficient_price'):
+    """
+    Rebase each card's series so that its first positive price equals 100.
+    Cards without any positive price are NaN throughout (see has_rebased_values).
+    """
+    values = df_cards[value_column]
+    first_price = values.where(values > 0).groupby(df_cards['card_name_set']).transform('first')
+    return values / first_price * 100
+
+
+def has_rebased_values(df_cards, rebased):
+    """Rows of the cards that have at least one rebased value"""
+    return rebased.notna().groupby(df_cards['card_name_set']).transform('any')
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: pick n_out indices of (x, y) that keep the
+    visual shape of the line. First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    # Interior points are split into n_out - 2 buckets of (roughly) equal size
+    bucket_size = (n - 2) / (n_out - 2)
+    selected = 0
+    for i in range(n_out - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n - 1)
+        if next_start >= next_end:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next average
+        areas = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+
+    return indices
+
+
+def downsample(df, x_column, y_column, max_points):
+    """
+    Reduce a time series to at most max_points rows with LTTB.
+    Series already under the budget (or max_points=None) are returned untouched.
+    """
+    if max_points is None or len(df) <= max_points:
+        return df
+
+    df = df[df[y_column].notna()]
+    if len(df) <= max_points:
+        return df
+
+    x = df[x_column]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype('int64')
+    indices = lttb_indices(x.to_numpy(), df[y_column].to_numpy(), max_points)
+    return df.iloc[indices]
+
+
+def index_by_card(df_historical):
+    """
+    Split the historical table into one date-sorted frame per card_name_set.
+    Looking up a card is then a dict access instead of a scan over the whole table.
+    """
+    return {
+        card: card_data.reset_index(drop=True)
+        for card, card_data in df_historical.groupby('card_name_set', sort=False)
+    }
+
+
+# Price columns stored per card and day (efficient_price drives every chart)
+PRICE_COLUMNS = [
+    'efficient_price', 'trend_price', 'ms_trend_price', 'conservative_price',
+    'value_price', 'from_price'
+]
+
+# Summary tables maintained by the ingestion job
+CARD_SUMMARY_TABLE = 'mtg_card_prices_summary'
+DAILY_SUMMARY_TABLE = 'mtg_card_prices_daily'
+
+
+def create_schema(conn):
+    """Create the historical table, its summary tables and indexes if they don't exist"""
+    price_columns = ', '.join(f"{col} REAL" for col in PRICE_COLUMNS)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTORICAL_TABLE} (
+            date TEXT NOT NULL,
+            card_name_set TEXT NOT NULL,
+            {price_columns}
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CARD_SUMMARY_TABLE} (
+            card_name_set TEXT PRIMARY KEY,
+            first_date TEXT,
+            last_date TEXT,
+            last_price REAL,
+            min_price REAL,
+            max_price REAL
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DAILY_SUMMARY_TABLE} (
+            date TEXT PRIMARY KEY,
+            cards_priced INTEGER,
+            total_efficient_price REAL,
+            ingested_at TEXT
+        )
+    """)
+    ensure_indexes(conn)
+
+
+def table_columns(conn, table=HISTORICAL_TABLE):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def summarize_cards(conn, where=''):
+    """
+    Insert the per-card summary of every card matching `where` (a WHERE clause
+    on card_name_set, applied to the daily table and to every tier)
+    """
+    parts = [f"""
+        SELECT card_name_set, date AS first_date, date AS last_date,
+               efficient_price AS low, efficient_price AS high
+        FROM {HISTORICAL_TABLE} {where}
+    """]
+    # The last price is the close of the card's most recent row, looked up
+    # through the (card_name_set, ...) indexes
+    last_parts = [f"""
+        SELECT efficient_price FROM {HISTORICAL_TABLE}
+        WHERE card_name_set = g.card_name_set AND date = g.last_date
+    """]
+    for source in TIER_SOURCES:
+        if table_exists(conn, source.table):
+            parts.append(f"SELECT card_name_set, first_date, last_date, low, high FROM {source.table} {where}")
+            last_parts.append(f"""
+                SELECT close FROM {source.table}
+                WHERE card_name_set = g.card_name_set AND last_date = g.last_date
+            """)
+
+    conn.execute(f"""
+        INSERT INTO {CARD_SUMMARY_TABLE} (card_name_set, first_date, last_date, last_price, min_price, max_price)
+        SELECT card_name_set, first_date, last_date, ({' UNION ALL '.join(last_parts)} LIMIT 1), min_price, max_price
+        FROM (
+            SELECT card_name_set, MIN(first_date) AS first_date, MAX(last_date) AS last_date,
+                   MIN(low) AS min_price, MAX(high) AS max_price
+            FROM ({' UNION ALL '.join(parts)})
+            GROUP BY card_name_set
+        ) g
+    """)
+
+
+# Merging one day's prices into the per-card summary: min/max are widened and
+# the last price only moves forward (scalar MIN/MAX return NULL on a NULL argument)
+_MERGE_SUMMARY = """
+    ON CONFLICT (card_name_set) DO UPDATE SET
+        first_date = MIN(first_date, excluded.first_date),
+        last_price = CASE WHEN excluded.last_date >= last_date THEN excluded.last_price ELSE last_price END,
+        last_date = MAX(last_date, excluded.last_date),
+        min_price = COALESCE(MIN(min_price, excluded.min_price), min_price, excluded.min_price),
+        max_price = COALESCE(MAX(max_price, excluded.max_price), max_price, excluded.max_price)
+"""
+
+
+def upsert_daily_prices(conn, date, df_prices):
+    """
+    Replace the prices of one day with df_prices (one row per card_name_set) in a
+    single transaction and update the summaries. The new prices are merged into
+    the per-card summary; only cards whose stored first/last date, min or max
+    came from a replaced price are recomputed from their full history. Running it
+    again for the same date, with the same or corrected prices, gives the same
+    database as a full rebuild.
+    """
+    columns = [col for col in table_columns(conn) if col in df_prices.columns and col != 'date']
+    df_prices = df_prices.drop_duplicates('card_name_set')
+    rows = df_prices[columns].astype(object).where(df_prices[columns].notna(), None)
+    placeholders = ', '.join('?' * (len(columns) + 1))
+    rescanned = "card_name_set IN (SELECT card_name_set FROM temp.rescan_cards)"
+
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS replaced_prices (card_name_set TEXT PRIMARY KEY, efficient_price REAL)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS rescan_cards (card_name_set TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.replaced_prices")
+        conn.execute("DELETE FROM temp.rescan_cards")
+        conn.execute(f"""
+            INSERT OR REPLACE INTO temp.replaced_prices
+            SELECT card_name_set, efficient_price FROM {HISTORICAL_TABLE} WHERE date = ?
+        """, (date,))
+
+        conn.execute(f"DELETE FROM {HISTORICAL_TABLE} WHERE date = ?", (date,))
+        conn.executemany(
+            f"INSERT INTO {HISTORICAL_TABLE} (date, {', '.join(columns)}) VALUES ({placeholders})",
+            ((date, *row) for row in rows.itertuples(index=False, name=None))
+        )
+
+        # Cards whose summary depended on a replaced price: the day is gone for
+        # the card (first/last date), or its old price was the min (max) and the
+        # new one is missing or higher (lower)
+        conn.execute(f"""
+            INSERT INTO temp.rescan_cards
+            SELECT o.card_name_set
+            FROM temp.replaced_prices o
+            JOIN {CARD_SUMMARY_TABLE} s ON s.card_name_set = o.card_name_set
+            LEFT JOIN {HISTORICAL_TABLE} n ON n.card_name_set = o.card_name_set AND n.date = ?
+            WHERE (n.card_name_set IS NULL AND ? IN (s.first_date, s.last_date))
+               OR (o.efficient_price = s.min_price AND NOT COALESCE(n.efficient_price <= o.efficient_price, 0))
+               OR (o.efficient_price = s.max_price AND NOT COALESCE(n.efficient_price >= o.efficient_price, 0))
+        """, (date, date))
+        conn.execute(f"DELETE FROM {CARD_SUMMARY_TABLE} WHERE {rescanned}")
+        summarize_cards(conn, f"WHERE {rescanned}")
+
+        conn.execute(f"""
+            INSERT INTO {CARD_SUMMARY_TABLE} (card_name_set, first_date, last_date, last_price, min_price, max_price)
+            SELECT card_name_set, date, date, efficient_price, efficient_price, efficient_price
+            FROM {HISTORICAL_TABLE}
+            WHERE date = ? AND NOT {rescanned}
+            {_MERGE_SUMMARY}
+        """, (date,))
+
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {DAILY_SUMMARY_TABLE} (date, cards_priced, total_efficient_price, ingested_at)
+            SELECT ?, COUNT(efficient_price), SUM(efficient_price), datetime('now')
+            FROM {HISTORICAL_TABLE}
+            WHERE date = ?
+        """, (date, date))
+
+    return len(rows)
+
+
+def rebuild_summaries(conn):
+    """
+    Recompute both summary tables. The per-card summary covers every tier;
+    the per-date one only the days still stored at daily resolution.
+    """
+    with conn:
+        conn.execute(f"DELETE FROM {CARD_SUMMARY_TABLE}")
+        summarize_cards(conn)
+        conn.execute(f"DELETE FROM {DAILY_SUMMARY_TABLE} WHERE date >= (SELECT MIN(date) FROM {HISTORICAL_TABLE})")
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {DAILY_SUMMARY_TABLE} (date, cards_priced, total_efficient_price, ingested_at)
+            SELECT date, COUNT(efficient_price), SUM(efficient_price), datetime('now')
+            FROM {HISTORICAL_TABLE}
+            GROUP BY date
+        """)
+
+
+def create_tier_tables(conn):
+    """Create the weekly and monthly rollup tables"""
+    for table in (WEEKLY_TABLE, MONTHLY_TABLE):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                card_name_set TEXT NOT NULL,
+                period_start TEXT NOT NULL,
+                period_end TEXT,
+                first_date TEXT,
+                last_date TEXT,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                avg_price REAL,
+                days INTEGER,
+                PRIMARY KEY (card_name_set, period_start)
+            )
+        """)
+    upgrade_tier_tables(conn)
+
+
+def upgrade_tier_tables(conn):
+    """Add and fill period_end in tier tables written before it existed, and index it"""
+    for table in (WEEKLY_TABLE, MONTHLY_TABLE):
+        if not table_exists(conn, table):
+            continue
+        if 'period_end' not in table_columns(conn, table):
+            with conn:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN period_end TEXT")
+                conn.execute(f"UPDATE {table} SET period_end = {TIER_PERIOD_END[table]}")
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_last_date")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_period_end ON {table} (period_end)")
+    conn.commit()
+
+
+# Merging a new rollup into an existing row for the same card and period
+# (e.g. late data for an already compacted week) keeps the OHLC semantics
+_MERGE_ROLLUP = """
+    ON CONFLICT (card_name_set, period_start) DO UPDATE SET
+        open = CASE WHEN excluded.first_date < first_date THEN excluded.open ELSE open END,
+        close = CASE WHEN excluded.last_date > last_date THEN excluded.close ELSE close END,
+        first_date = MIN(first_date, excluded.first_date),
+        last_date = MAX(last_date, excluded.last_date),
+        high = MAX(high, excluded.high),
+        low = MIN(low, excluded.low),
+        avg_price = (avg_price * days + excluded.avg_price * excluded.days) / (days + excluded.days),
+        days = days + excluded.days
+"""
+
+
+def compact_history(conn, daily_days=365, weekly_days=3 * 365):
+    """
+    Roll old history up into coarser tiers, in one transaction:
+    days older than daily_days (counted back from the latest date, aligned to a
+    Monday) become weekly OHLC rows, and weeks older than weekly_days (aligned to
+    the first of a month) become monthly rows. Weeks belong to the month they
+    start in. Returns the number of rows moved per tier.
+    """
+    latest = latest_history_date(conn)
+    if latest is None or pd.isna(latest):
+        return {'weekly': 0, 'monthly': 0}
+
+    daily_cutoff = latest - pd.Timedelta(days=daily_days)
+    daily_cutoff = (daily_cutoff - pd.Timedelta(days=daily_cutoff.weekday())).strftime('%Y-%m-%d')
+    weekly_cutoff = (latest - pd.Timedelta(days=weekly_days)).replace(day=1).strftime('%Y-%m-%d')
+
+    create_tier_tables(conn)
+    with conn:
+        # Days -> weeks (date(d, 'weekday 0', '-6 days') is the Monday of d's week)
+        moved_daily = conn.execute(f"SELECT COUNT(*) FROM {HISTORICAL_TABLE} WHERE date < ?", (daily_cutoff,)).fetchone()[0]
+        conn.execute(f"""
+            INSERT INTO {WEEKLY_TABLE} (card_name_set, period_start, period_end, first_date, last_date, open, high, low, close, avg_price, days)
+            SELECT card_name_set, period_start, {TIER_PERIOD_END[WEEKLY_TABLE]}, MIN(date), MAX(date), MIN(open), MAX(price), MIN(price), MIN(close), AVG(price), COUNT(*)
+            FROM (
+                SELECT card_name_set, date, efficient_price AS price,
+                       date(date, 'weekday 0', '-6 days') AS period_start,
+                       FIRST_VALUE(efficient_price) OVER period AS open,
+                       LAST_VALUE(efficient_price) OVER period AS close
+                FROM {HISTORICAL_TABLE}
+                WHERE date < ? AND efficient_price IS NOT NULL
+                WINDOW period AS (
+                    PARTITION BY card_name_set, date(date, 'weekday 0', '-6 days')
+                    ORDER BY date
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                )
+            )
+            WHERE true
+            GROUP BY card_name_set, period_start
+            {_MERGE_ROLLUP}
+        """, (daily_cutoff,))
+        conn.execute(f"DELETE FROM {HISTORICAL_TABLE} WHERE date < ?", (daily_cutoff,))
+
+        # Weeks -> months
+        moved_weekly = conn.execute(f"SELECT COUNT(*) FROM {WEEKLY_TABLE} WHERE period_start < ?", (weekly_cutoff,)).fetchone()[0]
+        conn.execute(f"""
+            INSERT INTO {MONTHLY_TABLE} (card_name_set, period_start, period_end, first_date, last_date, open, high, low, close, avg_price, days)
+            SELECT card_name_set, period_start, {TIER_PERIOD_END[MONTHLY_TABLE]}, MIN(first_date), MAX(last_date), MIN(first_open), MAX(high), MIN(low), MIN(last_close),
+                   SUM(avg_price * days) / SUM(days), SUM(days)
+            FROM (
+                SELECT card_name_set, first_date, last_date, high, low, avg_price, days,
+                       strftime('%Y-%m-01', period_start) AS period_start,
+                       FIRST_VALUE(open) OVER period AS first_open,
+                       LAST_VALUE(close) OVER period AS last_close
+                FROM {WEEKLY_TABLE}
+                WHERE period_start < ?
+                WINDOW period AS (
+                    PARTITION BY card_name_set, strftime('%Y-%m-01', period_start)
+                    ORDER BY period_start
+                    ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                )
+            )
+            WHERE true
+            GROUP BY card_name_set, period_start
+            {_MERGE_ROLLUP}
+        """, (weekly_cutoff,))
+        conn.execute(f"DELETE FROM {WEEKLY_TABLE} WHERE period_start < ?", (weekly_cutoff,))
+
+    return {'weekly': moved_daily, 'monthly': moved_weekly}
@@ -0,0 +1,183 @@
+"""
+Import a Cardmarket stock export (CSV) as a portfolio file.
+
+    python import_cardmarket.py stock.csv alice.csv
+    python import_cardmarket.py stock.csv data/alice.csv --glossary data/glossary.parquet --date 2026-10-18
+
+The export is read in chunks, so files of hundreds of thousands of lines use a
+bounded amount of memory. Every article becomes a row with the columns of a
+user output sheet: amount, card_name, card_set, language, condition, foil,
+signed, listed_price and notes come from the export, date is the import date
+and the other price and market columns are left empty for the pricing job.
+With --glossary, card_name/card_set pairs are checked against the glossary and
+rows not found in it are also written to <output>.unmatched.csv so the set
+names can be fixed. The glossary columns themselves are not written: the app
+merges them in when the portfolio is loaded, as for a Google Sheet.
+The result can be pasted into the user's sheet or served by the local data
+source (see README); the dashboard shows N/A prices until the pricing job
+fills the price columns.
+"""
+import argparse
+import csv
+import datetime
+import os
+import sys
+import time
+
+import pandas as pd
+
+import schema
+import sources
+
+
+# Columns of a user output sheet
+SHEET_COLUMNS = schema.sheet_columns()
+
+# Portfolio column -> accepted export headers (Cardmarket renamed a few over time)
+EXPORT_HEADERS = {
+    'amount': ['Amount', 'Quantity', 'Count'],
+    'card_name': ['English Name', 'Name', 'Product Name'],
+    'card_set': ['Exp. Name', 'Expansion', 'Set', 'Expansion Name'],
+    'language': ['Language'],
+    'condition': ['Condition'],
+    'foil': ['Foil?', 'isFoil', 'Foil'],
+    'signed': ['Signed?', 'isSigned', 'Signed'],
+    'listed_price': ['Price'],
+    'notes': ['Comments', 'Comment'],
+}
+
+# Cardmarket language ids
+LANGUAGES = {
+    '1': 'English', '2': 'French', '3': 'German', '4': 'Spanish', '5': 'Italian',
+    '6': 'S-Chinese', '7': 'Japanese', '8': 'Portuguese', '9': 'Russian', '10': 'Korean',
+    '11': 'T-Chinese'
+}
+
+# Truthy flag cells ('X' in the web export, 1/true in the API one)
+FLAG_VALUES = {'x', '1', 'true', 'yes'}
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def detect_delimiter(path):
+    """Cardmarket writes ';' separated files, but files re-saved by spreadsheets may use ',' or tabs"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        header = f.readline()
+    try:
+        return csv.Sniffer().sniff(header, delimiters=';,\t').delimiter
+    except csv.Error:
+        return ';'
+
+
+def resolve_columns(header):
+    """Map the export header onto the portfolio columns: {portfolio column: export column}"""
+    columns = {}
+    for column, candidates in EXPORT_HEADERS.items():
+        found = next((name for name in candidates if name in header), None)
+        if found is not None:
+            columns[column] = found
+    missing = {'card_name', 'card_set'} - set(columns)
+    if missing:
+        raise ValueError(f"Not a Cardmarket export: no column for {', '.join(sorted(missing))}")
+    return columns
+
+
+def flag(values):
+    return values.str.strip().str.lower().isin(FLAG_VALUES).map({True: 'Yes', False: 'No'})
+
+
+def map_chunk(chunk, columns, date):
+    """A chunk of export rows as user sheet rows (all strings, like a sheet)"""
+    df = pd.DataFrame(index=chunk.index)
+    for column in SHEET_COLUMNS:
+        df[column] = chunk[columns[column]].str.strip() if column in columns else ''
+
+    if 'amount' not in columns:
+        df['amount'] = '1'
+    df['date'] = date
+    df['language'] = df['language'].replace(LANGUAGES)
+    df['condition'] = df['condition'].str.upper()
+    for column in ['foil', 'signed']:
+        df[column] = flag(df[column])
+    return df
+
+
+def read_glossary_keys(path):
+    """(card_name, card_set) pairs of a glossary file (CSV, Parquet or SQLite)"""
+    glossary = sources.read_local_table(path)
+    return glossary[['card_name', 'card_set']].astype(str).drop_duplicates()
+
+
+def import_export(path, output, glossary_path=None, date=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """
+    Stream the export at path into the portfolio CSV output, dated `date` (YYYY-MM-DD, default today).
+    progress(rows, bytes_read, total_bytes) is called after every chunk. An export
+    without rows gives a header-only output.
+    Returns {'rows': n, 'unmatched': n} (unmatched is None without a glossary).
+    """
+    date = date or datetime.date.today().isoformat()
+    glossary = read_glossary_keys(glossary_path) if glossary_path else None
+    unmatched_path = f"{os.path.splitext(output)[0]}.unmatched.csv"
+    total_bytes = os.path.getsize(path)
+    rows = 0
+    unmatched = 0 if glossary is not None else None
+    columns = None
+    if os.path.exists(unmatched_path):
+        os.remove(unmatched_path)
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        chunks = pd.read_csv(
+            f, sep=detect_delimiter(path), dtype=str, keep_default_na=False, chunksize=chunk_rows
+        )
+        for chunk in chunks:
+            if columns is None:
+                columns = resolve_columns(chunk.columns)
+            if chunk.empty:
+                continue
+            df = map_chunk(chunk, columns, date)
+            first = rows == 0
+            df.to_csv(output, mode='w' if first else 'a', header=first, index=False)
+
+            if glossary is not None:
+                joined = df.merge(glossary, on=['card_name', 'card_set'], how='left', indicator=True)
+                missing = joined[joined['_merge'] == 'left_only'].drop(columns='_merge')
+                if len(missing):
+                    missing.to_csv(unmatched_path, mode='w' if unmatched == 0 else 'a', header=unmatched == 0, index=False)
+                unmatched += len(missing)
+
+            rows += len(df)
+            if progress is not None:
+                progress(rows, f.tell(), total_bytes)
+
+    if rows == 0:
+        # Header-only export: still replace any previous output
+        pd.DataFrame(columns=SHEET_COLUMNS).to_csv(output, index=False)
+    return {'rows': rows, 'unmatched': unmatched}
+
+
+def print_progress(rows, bytes_read, total_bytes):
+    percent = 100 * bytes_read / total_bytes if total_bytes else 100
+    print(f"\r{rows:,} rows ({percent:.0f}%)", end='', flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('export', help="Cardmarket stock export (CSV)")
+    parser.add_argument('output', help="portfolio CSV to write")
+    parser.add_argument('--glossary', help="glossary file (CSV, Parquet or SQLite) to check card names and sets against")
+    parser.add_argument('--date', help="portfolio date (YYYY-MM-DD), today by default")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="rows parsed at a time")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result = import_export(args.export, args.output, args.glossary, args.date, args.chunk_rows, print_progress)
+    print()
+    print(f"{result['rows']:,} rows written to {args.output}")
+    if result['unmatched']:
+        print(f"{result['unmatched']:,} rows not in the glossary, see {os.path.splitext(args.output)[0]}.unmatched.csv")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Ingest a daily price snapshot into mtg_historical.db.
+
+    python ingest_prices.py snapshot.csv
+    python ingest_prices.py snapshot.parquet --date 2026-10-18 --db mtg_historical.db
+
+The snapshot has the columns of a user output sheet (card_name, card_set, foil,
+date and the price columns, formatted as in Google Sheets). Each date is
+replaced as a whole in a single transaction, so re-running the job for a day
+is safe.
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+import historical
+import portfolio
+import schema
+
+
+def read_snapshot(path):
+    """Read a CSV or Parquet snapshot as raw strings, like get_all_values() would"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path).astype(str)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def prepare_prices(df_snapshot):
+    """Derive card_name_set and clean the price columns the historical table stores"""
+    df_prices = pd.DataFrame({'card_name_set': portfolio.build_card_name_set(df_snapshot)})
+    for col in historical.PRICE_COLUMNS:
+        if col in df_snapshot.columns:
+            df_prices[col] = schema.parse_price(df_snapshot[col].mask(df_snapshot[col].isin(schema.NUMBER_NULLS)))
+    if 'date' in df_snapshot.columns:
+        df_prices['date'] = pd.to_datetime(df_snapshot['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+    return df_prices
+
+
+def ingest(db_path, df_snapshot, date=None):
+    """Upsert every day found in the snapshot (or all rows as `date`); returns {date: rows}"""
+    df_prices = prepare_prices(df_snapshot)
+    if date is not None:
+        df_prices['date'] = date
+    if 'date' not in df_prices.columns or df_prices['date'].isna().all():
+        raise ValueError("The snapshot has no usable 'date' column, pass --date")
+
+    conn = historical.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        historical.create_schema(conn)
+        ingested = {}
+        for day, df_day in df_prices.dropna(subset=['date']).groupby('date'):
+            ingested[day] = historical.upsert_daily_prices(conn, day, df_day.drop(columns=['date']))
+        return ingested
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('snapshot', help="CSV or Parquet price snapshot")
+    parser.add_argument('--date', help="price date (YYYY-MM-DD) overriding the snapshot's date column")
+    parser.add_argument('--db', default=historical.HISTORICAL_DB_PATH, help="historical database path")
+    parser.add_argument('--rebuild-summary', action='store_true', help="recompute the summary tables from scratch afterwards")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    ingested = ingest(args.db, read_snapshot(args.snapshot), args.date)
+    for day, rows in ingested.items():
+        print(f"{day}: {rows:,} cards")
+
+    if args.rebuild_summary:
+        conn = historical.connect(args.db)
+        historical.rebuild_summaries(conn)
+        conn.close()
+
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import functools
+import itertools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Hot-path instrumentation. Disabled by default: stage() then returns a shared
+# no-op context manager and record_payload() returns straight away.
+logger = logging.getLogger('mindseeker.perf')
+
+_enabled = False
+_run = threading.local()
+_NOOP = nullcontext()
+_fragment_runs = itertools.count(1)
+
+
+def is_enabled():
+    return _enabled
+
+
+def configure(enabled):
+    """Turn instrumentation on or off for the process"""
+    global _enabled
+    _enabled = bool(enabled)
+    if _enabled and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def start_run(run_id=None):
+    """Reset the records collected by the current script run (thread)"""
+    _run.records = []
+    _run.started = time.perf_counter()
+    _run.run_id = run_id
+
+
+def records():
+    """Records collected so far by the current script run"""
+    return list(getattr(_run, 'records', []))
+
+
+def elapsed():
+    """Seconds since start_run() in the current thread"""
+    started = getattr(_run, 'started', None)
+    return None if started is None else time.perf_counter() - started
+
+
+def _emit(record):
+    if not hasattr(_run, 'records'):
+        start_run()
+    record['run_id'] = getattr(_run, 'run_id', None)
+    _run.records.append(record)
+    logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def _timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _emit({
+            'stage': name,
+            'seconds': round(time.perf_counter() - started, 6),
+            'thread': threading.current_thread().name
+        })
+
+
+def stage(name):
+    """Time a block of code: `with perf.stage('load_user_data.clean'): ...`"""
+    if not _enabled:
+        return _NOOP
+    return _timed(name)
+
+
+def timed(name):
+    """Decorator version of stage()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _is_fragment_rerun():
+    """True when Streamlit reruns fragments only, not the whole script"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+def fragment(name):
+    """
+    timed() for st.fragment functions, recorded as stage 'fragment.<name>'.
+    A fragment-only rerun skips the top of the script where start_run() is
+    called, so its outermost fragment starts a run of its own (run_id
+    'fragment.<name>:<n>') instead of adding to the previous full run.
+    """
+    stage_name = f"fragment.{name}"
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            depth = getattr(_run, 'fragment_depth', 0)
+            if depth == 0 and _is_fragment_rerun():
+                start_run(f"{stage_name}:{next(_fragment_runs)}")
+            _run.fragment_depth = depth + 1
+            try:
+                with _timed(stage_name):
+                    return func(*args, **kwargs)
+            finally:
+                _run.fragment_depth = depth
+        return wrapper
+    return decorator
+
+
+def record_payload(name, payload):
+    """
+    Record the size of a payload sent to the browser.
+    payload is a callable returning the serialized payload (str/bytes) or its
+    size, so nothing is serialized when instrumentation is disabled.
+    """
+    if not _enabled:
+        return
+    value = payload() if callable(payload) else payload
+    size = value if isinstance(value, int) else len(value)
+    _emit({'payload': name, 'bytes': size})
+
+
+def record_metric(name, value):
+    """Record an arbitrary numeric measurement (cache sizes, counters...)"""
+    if not _enabled:
+        return
+    _emit({'metric': name, 'value': value})
+
+
+def summary():
+    """Records of the current run merged per name (time and payload size), as rows for a table"""
+    rows = {}
+    for record in records():
+        name = record.get('stage') or record.get('payload') or record.get('metric')
+        row = rows.setdefault(name, {'Stage': name, 'Time (ms)': None, 'Size (KB)': None, 'Value': None})
+        if 'stage' in record:
+            row['Time (ms)'] = round((row['Time (ms)'] or 0) + record['seconds'] * 1000, 1)
+        elif 'payload' in record:
+            row['Size (KB)'] = round((row['Size (KB)'] or 0) + record['bytes'] / 1024, 1)
+        else:
+            row['Value'] = record['value']
+    return list(rows.values())
@@ -0,0 +1,237 @@
+import operator
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import perf
+import schema
+
+
+# Card glossary (rarity, Reserved List, set metadata...) shared by all users
+GLOSSARY_SHEET_ID = '1aVRXJ373tp_4gjd1bPpexrpwOrVwr0Z49LB1SMz_90U'
+
+
+
+def get_setup_row(sheets, setup_sheet_id, username):
+    """The setup sheet row of a user (case insensitive) as a dict, or None"""
+    data = sheets.first_sheet(setup_sheet_id)
+    df_setup = pd.DataFrame(data[1:], columns=data[0])
+    
+    # Filter for the specific user (case insensitive)
+    user_row = df_setup[df_setup['user'].str.lower() == username.lower()]
+    
+    if len(user_row) == 0:
+        return None
+    return user_row.iloc[0].to_dict()
+
+
+def get_user_sheet_id(sheets, setup_sheet_id, username, setup_row=None):
+    """Get the sheet ID for a specific user from the setup sheet (or from their setup row when already at hand)"""
+    if setup_row is None:
+        setup_row = get_setup_row(sheets, setup_sheet_id, username)
+    
+    if setup_row is None:
+        return None
+    
+    # Get sheet ID from mtg_input_file column
+    if 'mtg_output_file' in setup_row:
+        sheet_id = setup_row['mtg_output_file']
+        # Extract sheet ID from URL if necessary
+        if 'spreadsheets/d/' in sheet_id:
+            sheet_id = sheet_id.split('spreadsheets/d/')[1].split('/')[0]
+        return sheet_id
+    else:
+        raise ValueError("MTG input file column not found in setup sheet")
+
+
+def load_user_data(sheets, setup_sheet_id, username, setup_row=None):
+    """
+    Load data for specific user from their Google Sheet (sheets is a sheets.SheetsGateway
+    or another data source). A setup_row already read skips the setup sheet lookup.
+    """
+    # Get user's sheet ID
+    with perf.stage('load_user_data.setup_sheet'):
+        sheet_id = get_user_sheet_id(sheets, setup_sheet_id, username, setup_row)
+    
+    if sheet_id is None:
+        raise ValueError("User not found in setup sheet")
+    
+    with perf.stage('load_user_data.user_sheet'):
+        data = sheets.first_sheet(sheet_id)
+        df = pd.DataFrame(data[1:], columns=data[0])
+    
+    # Get glossary sheet
+    with perf.stage('load_user_data.glossary_sheet'):
+        data_glossary = sheets.first_sheet(GLOSSARY_SHEET_ID)
+        df_glossary = pd.DataFrame(data_glossary[1:], columns=data_glossary[0])
+
+    with perf.stage('load_user_data.glossary_merge'):
+        df = df.merge(df_glossary, left_on=['card_name', 'card_set'], right_on=['card_name', 'card_set'], how='left')
+
+    with perf.stage('load_user_data.clean'):
+        return clean_user_data(df)
+
+
+def build_card_name_set(df):
+    """Key shared with the historical database: '<card name> - <set> - Foil|Regular'"""
+    finish = np.where(df['foil'] == 'Yes', 'Foil', 'Regular')
+    return df['card_name'].astype(str) + ' - ' + df['card_set'].astype(str) + ' - ' + finish
+
+
+# Days since the last sale -> liquidity bucket (anything else, e.g. a missing
+# or negative difference, is 'Not Available')
+LIQUIDITY_BUCKETS = [
+    (0, 1, 'Very High'),
+    (2, 7, 'High'),
+    (8, 14, 'Moderate'),
+    (15, 30, 'Low'),
+    (31, np.inf, 'Very Low'),
+]
+
+
+def liquidity(days):
+    conditions = [(days >= low) & (days <= high) for low, high, _ in LIQUIDITY_BUCKETS]
+    labels = [label for _, _, label in LIQUIDITY_BUCKETS]
+    return np.select(conditions, labels, default='Not Available')
+
+
+def sale_liquidity(df):
+    """Liquidity bucket of every row from the days between its date and last_sold_date"""
+    days_since_sale = (pd.to_datetime(df['date'], errors='coerce') - pd.to_datetime(df['last_sold_date'], errors='coerce')).dt.days
+    return liquidity(days_since_sale.to_numpy(dtype=float))
+
+
+def clean_user_data(df):
+    """Derive card_name_set and liquidity and coerce every column to its schema type"""
+    # Create card_name_set column
+    df['card_name_set'] = build_card_name_set(df)
+
+    df, bad_cells = schema.coerce(df)
+    if bad_cells:
+        perf.record_metric('load_user_data.bad_cells', sum(count for count, _ in bad_cells.values()))
+
+    df['liquidity'] = sale_liquidity(df)
+
+    # Calculate the purchase price difference, treating NaNs as 0
+    df['purchase_price_diff'] = df['efficient_price'] - df['purchase_price'].fillna(0)
+
+    return df
+
+
+def sheet_row_keys(df):
+    """
+    Stable key of every user sheet row: card_name_set, condition and language,
+    plus an occurrence number so repeated rows stay distinct.
+    """
+    key = build_card_name_set(df) + ' | ' + df['condition'].astype(str) + ' | ' + df['language'].astype(str)
+    return key + ' #' + key.groupby(key).cumcount().astype(str)
+
+
+# Columns the pricing job rewrites on every row each day. They are left out of
+# the row hashes and copied from the sheet onto the reused rows, so a new date
+# alone does not make the whole sheet "changed"
+VOLATILE_COLUMNS = ('date',)
+
+
+def stable_row_hashes(values):
+    """Hash of every data row of a sheet payload, ignoring the volatile columns"""
+    stable = operator.itemgetter(*[i for i, column in enumerate(values[0]) if column not in VOLATILE_COLUMNS])
+    # Hashing the plain row lists is much cheaper than comparing frames
+    return [hash(stable(row)) for row in values[1:]]
+
+
+# Header, per-row hashes (indexed by row key) of the raw user sheet and glossary
+# hash of the previous load, with the cleaned frame returned for them
+SheetState = namedtuple('SheetState', ['columns', 'row_hashes', 'glossary_hash', 'data'])
+
+
+class UserSheetSync:
+    """
+    Delta sync of the user sheets. A hash of every raw row of the previous load
+    is kept per user; on refresh the sheet rows are diffed by row key, and only
+    new or modified rows go through the glossary merge and the cleaning, the
+    rest of the cleaned frame is reused as is (with the VOLATILE_COLUMNS taken
+    from the sheet). The sheet itself is read in row batches by the gateway.
+    A changed header or glossary falls back to a full rebuild.
+    The cleaned frame kept for the next load is the one returned: under
+    copy-on-write it shares its memory with the caller's copy, so only the row
+    hashes (nbytes()) add to what the caller caches.
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    def load(self, sheets, setup_sheet_id, username, setup_row=None):
+        """Cleaned user data, re-cleaning only the rows changed since the previous load"""
+        with perf.stage('load_user_data.setup_sheet'):
+            sheet_id = get_user_sheet_id(sheets, setup_sheet_id, username, setup_row)
+
+        if sheet_id is None:
+            raise ValueError("User not found in setup sheet")
+
+        with perf.stage('load_user_data.user_sheet'):
+            values = sheets.first_sheet(sheet_id)
+            raw = pd.DataFrame(values[1:], columns=values[0])
+            raw.index = sheet_row_keys(raw)
+            hashes = pd.Series(stable_row_hashes(values), index=raw.index)
+
+        with perf.stage('load_user_data.glossary_sheet'):
+            values_glossary = sheets.first_sheet(GLOSSARY_SHEET_ID)
+            glossary = pd.DataFrame(values_glossary[1:], columns=values_glossary[0])
+            glossary_hash = hash(tuple(tuple(row) for row in values_glossary))
+
+        previous = self._states.get(username)
+        with perf.stage('load_user_data.clean'):
+            if (previous is None or not previous.columns.equals(raw.columns)
+                    or previous.glossary_hash != glossary_hash):
+                data = self.clean_rows(raw, glossary)
+                changed = len(raw)
+            else:
+                data, changed = self.apply_delta(previous, raw, hashes, glossary)
+        perf.record_metric('load_user_data.changed_rows', changed)
+
+        data = data.reset_index(drop=True)
+        self._states[username] = SheetState(raw.columns, hashes, glossary_hash, data)
+        return data
+
+    def clean_rows(self, raw, glossary):
+        """Merge the glossary into raw user rows and clean them, keeping the row keys as index"""
+        df = raw.rename_axis('row_key').reset_index()
+        df = df.merge(glossary, on=['card_name', 'card_set'], how='left')
+        df = clean_user_data(df).set_index('row_key')
+        # A card listed twice in the glossary must not duplicate the user's row
+        return df[~df.index.duplicated()]
+
+    def apply_delta(self, previous, raw, hashes, glossary):
+        """Rebuild the cleaned frame from the previous one; returns (frame, number of re-cleaned rows)"""
+        previous_hashes = previous.row_hashes.reindex(hashes.index)
+        unchanged = hashes.index[(hashes == previous_hashes).to_numpy()]
+        changed = hashes.index.difference(unchanged)
+
+        parts = [previous.data.set_axis(previous.row_hashes.index).loc[unchanged]]
+        if len(changed):
+            parts.append(self.clean_rows(raw.loc[changed], glossary))
+        # Back to the sheet's row order
+        data = pd.concat(parts).reindex(raw.index)
+        return self.refresh_volatile(data, raw), len(changed)
+
+    def refresh_volatile(self, data, raw):
+        """Copy the volatile columns of the sheet onto the cleaned frame and re-derive what depends on them"""
+        volatile = [column for column in VOLATILE_COLUMNS if column in raw.columns]
+        if not volatile:
+            return data
+        fresh, _ = schema.coerce(raw[volatile])
+        data = data.assign(**{column: fresh[column] for column in volatile})
+        data['liquidity'] = sale_liquidity(data)
+        return data
+
+    def nbytes(self, username):
+        """Memory held for username on top of the frame returned by its last load"""
+        state = self._states.get(username)
+        if state is None:
+            return 0
+        return int(state.row_hashes.memory_usage(index=True, deep=True))
+
+    def forget(self, username):
+        self._states.pop(username, None)
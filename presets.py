@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the sessions of one process are serialized
+    fcntl = None
+
+
+# Named column layouts of the Inventory Details grid, saved per user in a local
+# JSON file: {username: {preset name: [column, ...]}}
+PRESETS_PATH = 'column_presets.json'
+
+logger = logging.getLogger('mindseeker.presets')
+
+_lock = threading.Lock()
+
+
+def _read(path):
+    """Presets of every user; a missing or unreadable file has none"""
+    try:
+        with open(path) as f:
+            presets = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning("Unreadable column presets file %s, ignoring it", path, exc_info=True)
+        return {}
+    if not isinstance(presets, dict):
+        logger.warning("Unexpected content in column presets file %s, ignoring it", path)
+        return {}
+    return presets
+
+
+def _write(path, presets):
+    """Write the whole file atomically so concurrent sessions never see a partial file"""
+    tmp = tempfile.NamedTemporaryFile(
+        'w', dir=os.path.dirname(os.path.abspath(path)), prefix=f"{os.path.basename(path)}.", suffix='.tmp', delete=False
+    )
+    try:
+        with tmp as f:
+            json.dump(presets, f, indent=2, sort_keys=True)
+        os.replace(tmp.name, path)
+    except BaseException:
+        if os.path.exists(tmp.name):
+            os.remove(tmp.name)
+        raise
+
+
+@contextmanager
+def _locked(path):
+    """Serialize read-modify-write cycles on path across threads and worker processes"""
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_presets(username, path=PRESETS_PATH):
+    """{preset name: columns} of a user (usernames are case insensitive)"""
+    # The file is only ever replaced whole, reading needs no lock
+    return _read(path).get(username.lower(), {})
+
+
+def save_preset(username, name, columns, path=PRESETS_PATH):
+    """Create or overwrite a preset; returns the user's presets"""
+    with _locked(path):
+        presets = _read(path)
+        user_presets = presets.setdefault(username.lower(), {})
+        user_presets[name] = list(columns)
+        _write(path, presets)
+        return user_presets
+
+
+def delete_preset(username, name, path=PRESETS_PATH):
+    with _locked(path):
+        presets = _read(path)
+        user_presets = presets.get(username.lower(), {})
+        if user_presets.pop(name, None) is not None:
+            _write(path, presets)
+        return user_presets
@@ -0,0 +1,190 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Declarative schema of the portfolio columns: user output sheet, glossary and
+# derived columns. It drives the coercion at ingest and the column names,
+# categories and defaults shown in the app.
+logger = logging.getLogger('mindseeker.schema')
+
+# kind: 'text', 'number', 'price' or 'percentage' (see PARSERS)
+# category: 'Dimensions' or 'Metrics' in the column selector, None if not selectable
+# default: shown by default in the inventory table
+# nulls: cell values meaning "no value"
+# source: 'sheet' (user output sheet), 'glossary' (merged from the glossary) or 'derived' (computed on load)
+Column = namedtuple('Column', ['name', 'kind', 'display_name', 'category', 'default', 'nulls', 'source'])
+
+TEXT_NULLS = ('N/A',)
+NUMBER_NULLS = ('N/A', '')
+PERCENTAGE_NULLS = ('N/A', '', 'null')
+CURRENCY_SYMBOLS = ('€', '£', '$')
+
+
+def text(name, display_name, category='Dimensions', default=False, source='sheet'):
+    return Column(name, 'text', display_name, category, default, TEXT_NULLS, source)
+
+
+def number(name, display_name, category='Metrics', default=False, source='sheet'):
+    return Column(name, 'number', display_name, category, default, NUMBER_NULLS, source)
+
+
+def price(name, display_name, category='Metrics', default=False, source='sheet'):
+    return Column(name, 'price', display_name, category, default, NUMBER_NULLS, source)
+
+
+def percentage(name, display_name, category='Metrics', default=False, source='sheet'):
+    return Column(name, 'percentage', display_name, category, default, PERCENTAGE_NULLS, source)
+
+
+# Ordered as in the column selector
+COLUMNS = [
+    number('amount', 'Amount', category='Dimensions', default=True),
+    text('card_name', 'Card Name', default=True),
+    text('card_set', 'Set', default=True),
+    text('language', 'Language', default=True),
+    text('condition', 'Condition', default=True),
+    text('foil', 'Foil', default=True),
+    text('signed', 'Signed', default=True),
+    text('country', 'Country'),
+    text('liquidity', 'Liquidity', default=True, source='derived'),
+    text('last_sold_date', 'Last Sold Date', default=True),
+    text('alerts', 'Alerts', default=True),
+    text('notes', 'Notes'),
+    text('collection_number', 'Collection Number', source='glossary'),
+    text('rarity', 'Rarity', source='glossary'),
+    text('reserved_list', 'Reserved List', source='glossary'),
+    text('set_release_date', 'Set Release Date', source='glossary'),
+    text('frame_era', 'Frame Era', source='glossary'),
+    text('set_type', 'Set Type', source='glossary'),
+
+    price('from_price', 'From Price', default=True),
+    price('trend_price', 'Trend Price', default=True),
+    price('ms_trend_price', 'MS Trend Price', default=True),
+    price('efficient_price', 'Efficient Price', default=True),
+    price('conservative_price', 'Conservative Price', default=True),
+    price('value_price', 'Value Price', default=True),
+    number('total_stock', 'Total Stock'),
+    number('country_stock', 'Country Stock'),
+    percentage('equity_in_country', 'Equity in Country'),
+    percentage('equity_on_cardmarket', 'Equity on Cardmarket'),
+    price('listed_price', 'Cardmarket Listed Price'),
+    number('listed_stock', 'Cardmarket Listed Stock'),
+    price('total_efficient_value', 'Total Value'),
+    price('total_conservative_value', 'Conservative Value'),
+    percentage('price_diff_d7', 'Today vs D7', default=True),
+    price('purchase_price', 'Purchase Price'),
+    price('purchase_price_diff', 'Purchase Price Change'),
+    percentage('price_growth', 'Purchase Price Change %'),
+
+    text('date', 'Date', category=None),
+]
+
+SCHEMA = {column.name: column for column in COLUMNS}
+
+
+def display_names():
+    return {column.name: column.display_name for column in COLUMNS}
+
+
+def display_name(name):
+    """Display name of a column, falling back to a title-cased column name"""
+    column = SCHEMA.get(name)
+    return column.display_name if column else name.replace('_', ' ').title()
+
+
+def columns_in(category):
+    return [column.name for column in COLUMNS if column.category == category]
+
+
+def columns_of_kind(kind):
+    return [column.name for column in COLUMNS if column.kind == kind]
+
+
+def default_columns():
+    return [column.name for column in COLUMNS if column.default]
+
+
+def sheet_columns():
+    """Columns of a user output sheet"""
+    return [column.name for column in COLUMNS if column.source == 'sheet']
+
+
+def to_float(values):
+    """Strings to floats, unparseable ones to NaN (fast path when every value parses)"""
+    try:
+        return values.astype('float64')
+    except (ValueError, TypeError):
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+
+
+def parse_number(values):
+    """Counts stay integers when every cell holds a whole number"""
+    parsed = to_float(values)
+    if parsed.notna().all() and (parsed % 1 == 0).all():
+        return parsed.astype('int64')
+    return parsed
+
+
+def parse_price(values):
+    """'1.234,56 €' / '1,234.56' / '12.5' -> float: the last separator is the decimal point"""
+    cleaned = values.astype(str)
+    for symbol in CURRENCY_SYMBOLS:
+        cleaned = cleaned.str.replace(symbol, '', regex=False)
+    cleaned = cleaned.str.strip().str.replace(',', '.', regex=False)
+    # Every dot but the last one is a thousands separator (plain string ops
+    # above, the regex only runs on the few values that need it)
+    grouped = cleaned.str.count(r'\.') > 1
+    if grouped.any():
+        cleaned = cleaned.mask(grouped, cleaned[grouped].str.replace(r'\.(?=.*\.)', '', regex=True))
+    return to_float(cleaned)
+
+
+def parse_percentage(values):
+    """'5%' / '5,0 %' / '0.05' / '5' -> 0.05; plain numbers outside [-1, 1] are read as percents"""
+    cleaned = values.astype(str).str.strip().str.replace(',', '.', regex=False)
+    has_sign = cleaned.str.contains('%', regex=False).to_numpy()
+    parsed = to_float(cleaned.str.replace('%', '', regex=False).str.strip())
+    numbers = parsed.to_numpy(dtype=float)
+    scaled = np.where(has_sign | (np.abs(numbers) > 1), numbers / 100, numbers)
+    return pd.Series(scaled, index=values.index, name=values.name)
+
+
+PARSERS = {
+    'number': parse_number,
+    'price': parse_price,
+    'percentage': parse_percentage,
+}
+
+
+def coerce(df, max_examples=5):
+    """
+    Coerce every schema column present in df in one vectorized pass: null
+    sentinels become missing values and numeric kinds are parsed.
+    Returns the frame and the bad cells, {column: (count, [examples])} for
+    cells that were neither empty nor parseable.
+    """
+    coerced = {}
+    bad_cells = {}
+    for name in df.columns:
+        column = SCHEMA.get(name)
+        if column is None:
+            continue
+        values = df[name]
+        missing = values.isna() | values.isin(column.nulls)
+        if column.kind == 'text':
+            coerced[name] = values.mask(missing)
+            continue
+        parsed = PARSERS[column.kind](values.mask(missing))
+        bad = parsed.isna() & ~missing
+        if bad.any():
+            bad_cells[name] = (int(bad.sum()), values[bad].head(max_examples).tolist())
+        coerced[name] = parsed
+
+    if coerced:
+        df = df.assign(**coerced)
+    if bad_cells:
+        logger.warning("Unparseable cells: %s", {name: count for name, (count, _) in bad_cells.items()})
+    return df, bad_cells
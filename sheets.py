@@ -0,0 +1,180 @@
+import logging
+import random
+import threading
+import time
+
+import gspread
+
+import perf
+
+
+# Google Sheets access for the app: every read is a values.batchGet request
+# (one per spreadsheet, whatever the number of ranges), retried with
+# exponential backoff when the API reports a quota or transient error.
+logger = logging.getLogger('mindseeker.sheets')
+
+# Rows per range when reading a whole worksheet; all the ranges go in one
+# request. Row ranges ('1:5000') without a sheet name cover every column of
+# the first worksheet.
+SHEET_BATCH_ROWS = 5000
+
+# Quota exceeded (429) and transient backend errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    return isinstance(error, gspread.exceptions.APIError) and error.code in RETRY_STATUS_CODES
+
+
+def pad_rows(values):
+    """The API omits trailing empty cells: pad every row to the header width"""
+    if not values:
+        return []
+    width = len(values[0])
+    return [row + [''] * (width - len(row)) for row in values]
+
+
+class TokenBucket:
+    """
+    Blocking token bucket: bursts of up to `capacity` requests, refilled at
+    `rate` tokens per second. In any window of t seconds at most
+    capacity + rate * t requests get through.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._stats = {'acquired': 0, 'waits': 0, 'wait_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._stats['acquired'] += 1
+                    if waited:
+                        self._stats['waits'] += 1
+                        self._stats['wait_seconds'] += waited
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, wait_seconds=round(self._stats['wait_seconds'], 3))
+
+
+class SheetsGateway:
+    """
+    Batched, retrying reads on top of an authorized gspread client.
+    Spreadsheets are addressed by key only; reading a whole worksheet makes one
+    metadata request for its row count. Optionally identical reads are coalesced
+    (coalescer, a caching.SingleFlight) and every request, retries included,
+    waits for a token of the quota governor (a TokenBucket).
+    """
+
+    def __init__(self, gc, max_retries=5, base_delay=1.0, max_delay=32.0, sleep=time.sleep,
+                 coalescer=None, governor=None, batch_rows=SHEET_BATCH_ROWS):
+        self.gc = gc
+        self.batch_rows = batch_rows
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.coalescer = coalescer
+        self.governor = governor
+        self.requests = 0
+        self._sleep = sleep
+
+    def call(self, func, *args, **kwargs):
+        """Call func, retrying quota/transient API errors with jittered exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except gspread.exceptions.APIError as error:
+                if not is_retryable(error) or attempt == self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning("Sheets API error %s, retrying in %.1fs (attempt %d/%d)",
+                               error.code, delay, attempt + 1, self.max_retries)
+                perf.record_metric('sheets.retry_wait_s', round(delay, 3))
+                self._sleep(delay)
+
+    def throttle(self):
+        """Wait for the quota governor before sending a request"""
+        if self.governor is not None:
+            waited = self.governor.acquire()
+            if waited:
+                perf.record_metric('sheets.throttle_wait_s', round(waited, 3))
+        self.requests += 1
+
+    def request(self, sheet_id, ranges):
+        """One values.batchGet request, after waiting for the quota governor"""
+        self.throttle()
+        return self.gc.http_client.values_batch_get(sheet_id, list(ranges))
+
+    def request_row_count(self, sheet_id):
+        """One spreadsheets.get request for the grid size of the first worksheet"""
+        self.throttle()
+        metadata = self.gc.http_client.fetch_sheet_metadata(
+            sheet_id, params={'fields': 'sheets.properties.gridProperties.rowCount'}
+        )
+        return metadata['sheets'][0]['properties']['gridProperties']['rowCount']
+
+    def row_count(self, sheet_id):
+        """Rows of the first worksheet's grid, blank rows included"""
+        if self.coalescer is None:
+            return self.call(self.request_row_count, sheet_id)
+        return self.coalescer.do((sheet_id, 'row_count'), self.call, self.request_row_count, sheet_id)
+
+    def fetch(self, sheet_id, ranges):
+        response = self.call(self.request, sheet_id, ranges)
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+    def batch_get(self, sheet_id, ranges):
+        """Values of several ranges of one spreadsheet in a single request, one list of rows per range"""
+        ranges = tuple(ranges)
+        if self.coalescer is None:
+            return self.fetch(sheet_id, ranges)
+        return self.coalescer.do((sheet_id, ranges), self.fetch, sheet_id, ranges)
+
+    def first_sheet(self, sheet_id):
+        """
+        All rows (header first) of the first worksheet of a spreadsheet, every
+        column: the grid is split into row ranges of batch_rows rows, all read
+        in a single values.batchGet request
+        """
+        row_count = self.row_count(sheet_id)
+        ranges = [
+            f"{start}:{min(start + self.batch_rows - 1, row_count)}"
+            for start in range(1, row_count + 1, self.batch_rows)
+        ]
+        if not ranges:
+            return []
+        rows = []
+        for index, batch in enumerate(self.batch_get(sheet_id, ranges)):
+            if batch:
+                # The API drops trailing empty rows of each range: put back the
+                # blank rows between the previous data and this range
+                rows.extend([] for _ in range(index * self.batch_rows - len(rows)))
+                rows.extend(batch)
+        return pad_rows(rows)
+
+    def stats(self):
+        """Requests sent and coalescer/governor counters, for the admin panel"""
+        stats = {'requests': self.requests}
+        if self.coalescer is not None:
+            stats.update({f"coalescer.{name}": value for name, value in self.coalescer.stats().items()})
+        if self.governor is not None:
+            stats.update({f"governor.{name}": value for name, value in self.governor.stats().items()})
+        return stats
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+import perf
+import portfolio
+
+
+# Data sources of the user portfolios, the setup table and the glossary.
+# A data source is any object with
+#   first_sheet(sheet_id) -> [header, row, ...] (every cell a string, as the
+#                            Sheets API returns them)
+#   stats()               -> dict of counters for the admin panel
+# sheets.SheetsGateway reads Google Sheets; LocalSheets below reads files, so
+# both go through the same cleaning pipeline (portfolio.load_user_data and
+# portfolio.UserSheetSync).
+
+# Local name of the setup table and of the glossary (portfolio.GLOSSARY_SHEET_ID)
+SETUP_NAME = 'setup'
+GLOSSARY_NAME = 'glossary'
+
+# Tried in this order when a sheet id has no extension
+LOCAL_EXTENSIONS = ('.parquet', '.csv', '.sqlite', '.db')
+
+
+def frame_values(df):
+    """A DataFrame as a Sheets API payload: header row then rows of strings, '' for missing cells"""
+    df = df.astype(object).where(df.notna(), '')
+    return [[str(column) for column in df.columns]] + df.astype(str).values.tolist()
+
+
+def read_sqlite_table(path, table=None):
+    """A table (by default the first one) of a SQLite file"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        if table is None:
+            row = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid LIMIT 1").fetchone()
+            if row is None:
+                raise ValueError(f"No table in {path}")
+            table = row[0]
+        return pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+    finally:
+        conn.close()
+
+
+def read_local_table(path):
+    """Read a CSV, Parquet or SQLite file as strings"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith(('.sqlite', '.db')):
+        return read_sqlite_table(path)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+class LocalSheets:
+    """
+    Data source reading local CSV, Parquet or SQLite files from directory, for
+    air-gapped deployments and network-free benchmarks.
+    A sheet id is a file name relative to directory, with or without extension:
+    the setup table is "setup", the glossary "glossary", and the
+    mtg_output_file column of the setup table names each user's file.
+    Files are parsed again only when their modification time changes.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self._cache = {}
+        self._stats = {'reads': 0, 'cache_hits': 0}
+        self._lock = threading.Lock()
+
+    def path(self, sheet_id):
+        """File backing sheet_id; raises FileNotFoundError when there is none"""
+        name = GLOSSARY_NAME if sheet_id == portfolio.GLOSSARY_SHEET_ID else sheet_id
+        candidates = [name] if os.path.splitext(name)[1] else [name + ext for ext in LOCAL_EXTENSIONS]
+        for candidate in candidates:
+            path = os.path.abspath(os.path.join(self.directory, candidate))
+            # Sheet ids come from the setup table: never leave the data directory
+            if not path.startswith(self.directory + os.sep):
+                raise ValueError(f"Sheet {sheet_id!r} is outside {self.directory}")
+            if os.path.isfile(path):
+                return path
+        raise FileNotFoundError(f"No local file for sheet {sheet_id!r} in {self.directory}")
+
+    def first_sheet(self, sheet_id):
+        path = self.path(sheet_id)
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._stats['cache_hits'] += 1
+                return cached[1]
+
+        with perf.stage('sources.read_local'):
+            values = frame_values(read_local_table(path))
+        with self._lock:
+            self._stats['reads'] += 1
+            self._cache[path] = (mtime, values)
+        return values
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
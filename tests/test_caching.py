@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import caching
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_shared_frame_views_are_private():
+    shared = caching.SharedFrame(pd.DataFrame({'price': [1.0, 2.0]}))
+    view = shared.view()
+    view.loc[0, 'price'] = 5.0
+    view['extra'] = 1
+    assert shared.view()['price'].tolist() == [1.0, 2.0]
+    assert list(shared.columns) == ['price']
+
+
+def test_shared_frame_measures_its_size_on_demand():
+    frame = pd.DataFrame({'name': ['a' * 100] * 10})
+    shared = caching.SharedFrame(frame)
+    assert shared._nbytes is None
+    assert shared.nbytes == int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def test_refresh_finishing_after_eviction_forgets_the_key():
+    release = threading.Event()
+    evicted = []
+
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        if len(loads) > 1:
+            release.wait(5)
+        return key
+
+    store = caching.StaleWhileRevalidate(loader, max_age=0, on_evict=evicted.append)
+    store.get('alice')
+    store.refresh_in_background('alice')
+    store.evict('alice')
+    release.set()
+    # Once by evict(), once more when the refresh result is thrown away
+    wait_until(lambda: len(evicted) == 2)
+    assert store.peek('alice') is None
+    assert not store.is_refreshing('alice')
+
+
+def test_prefetch_after_a_finished_load_does_not_load_again():
+    loads = []
+    store = caching.StaleWhileRevalidate(lambda key: loads.append(key) or key, max_age=60)
+    store.get('alice')
+    # The prefetch thread starting only once get() is done
+    store._prefetch('alice')
+    assert loads == ['alice']
+
+
+class Loader:
+    """Loader returning '<key> v<n>' on its n-th call; fails while `failing` is set"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    def __call__(self, key):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("sheet unavailable")
+        return f"{key} v{self.calls}"
+
+
+def age(store, key, seconds):
+    """Make the snapshot of key look `seconds` older"""
+    snapshot = store.peek(key)
+    store._snapshots[key] = caching.Snapshot(snapshot.value, snapshot.fetched_at - seconds)
+
+
+def test_stale_snapshot_is_returned_then_refreshed():
+    loader = Loader()
+    store = caching.StaleWhileRevalidate(loader, max_age=60)
+    assert store.get('alice').value == 'alice v1'
+    assert store.get('alice').value == 'alice v1'
+    assert loader.calls == 1
+
+    age(store, 'alice', 120)
+    # The stale snapshot answers right away, the refresh runs behind it
+    assert store.get('alice').value == 'alice v1'
+    wait_until(lambda: store.peek('alice').value == 'alice v2')
+    assert loader.calls == 2
+    assert store.age(store.get('alice')) < 60
+
+
+def test_failed_refresh_keeps_the_old_snapshot():
+    loader = Loader()
+    store = caching.StaleWhileRevalidate(loader, max_age=60)
+    store.get('alice')
+    age(store, 'alice', 120)
+
+    loader.failing = True
+    assert store.get('alice').value == 'alice v1'
+    wait_until(lambda: not store.is_refreshing('alice'))
+    assert store.peek('alice').value == 'alice v1'
+
+    # The next stale read retries
+    loader.failing = False
+    store.get('alice')
+    wait_until(lambda: store.peek('alice').value == 'alice v3')
+
+
+def test_least_recently_read_keys_are_evicted_over_budget():
+    evicted = []
+    store = caching.StaleWhileRevalidate(
+        lambda key: key, max_age=60, max_bytes=2, sizer=lambda key, value: 1, on_evict=evicted.append
+    )
+    store.get('alice')
+    store.get('bob')
+    store.get('alice')
+    store.get('carol')
+
+    assert evicted == ['bob']
+    assert [row['key'] for row in store.usage()] == ['alice', 'carol']
+    assert store.stats()['evictions'] == 1
+
+
+def test_a_key_larger_than_the_budget_is_still_kept():
+    store = caching.StaleWhileRevalidate(lambda key: key, max_age=60, max_bytes=1, sizer=lambda key, value: 5)
+    store.get('alice')
+    store.get('bob')
+    assert store.peek('alice') is None
+    assert store.peek('bob').value == 'bob'
+
+
+def test_get_during_a_prefetch_waits_for_it():
+    release = threading.Event()
+    loads = []
+
+    def loader(key, setup_row=None):
+        loads.append(setup_row)
+        release.wait(5)
+        return key
+
+    store = caching.StaleWhileRevalidate(loader, max_age=60)
+    thread = store.prefetch('alice', {'user': 'alice'})
+    wait_until(lambda: loads)
+    result = []
+    getter = threading.Thread(target=lambda: result.append(store.get('alice')))
+    getter.start()
+    wait_until(lambda: store.flight.stats()['coalesced'] == 1)
+    release.set()
+    thread.join(5)
+    getter.join(5)
+
+    assert result[0].value == 'alice'
+    assert loads == [{'user': 'alice'}]
+    assert store.prefetch('alice') is None
+
+
+def test_single_flight_counts_coalesced_callers():
+    flight = caching.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', load))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: flight.stats()['calls'] == 5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {'calls': 5, 'executed': 1, 'coalesced': 4, 'hits': 0}
+
+
+def test_single_flight_shares_errors_and_does_not_cache_them():
+    flight = caching.SingleFlight(ttl=60)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 'value') == 'value'
+    # Within the ttl the result is handed out without calling again
+    assert flight.do('key', fail) == 'value'
+    assert flight.stats()['hits'] == 1
+
+
+def disk_load(directory, key, marker):
+    tier = caching.DiskTier(directory)
+
+    def loader():
+        with open(marker, 'a') as f:
+            f.write('load\n')
+        time.sleep(0.2)
+        return pd.DataFrame({'key': [key]})
+
+    return tier.get_or_load(key, loader).value['key'].tolist()
+
+
+def test_disk_tier_loads_a_key_once_across_processes(tmp_path):
+    marker = str(tmp_path / 'loads.txt')
+    with multiprocessing.Pool(4) as pool:
+        results = pool.starmap(disk_load, [(str(tmp_path / 'cache'), 'alice', marker)] * 4)
+
+    assert results == [['alice']] * 4
+    with open(marker) as f:
+        assert f.read().count('load') == 1
+
+
+def test_disk_tier_expires_and_prunes(tmp_path):
+    tier = caching.DiskTier(str(tmp_path), retention=3600)
+    tier.get_or_load('alice', lambda: pd.DataFrame({'a': [1]}))
+    assert tier.read('alice', max_age=60) is not None
+    assert tier.read('alice', max_age=-1) is None
+
+    old = time.time() - 7200
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (old, old))
+    tier.prune()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,122 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import historical
+
+
+def prices(values):
+    return pd.DataFrame({
+        'card_name_set': list(values),
+        'efficient_price': list(values.values()),
+        'trend_price': list(values.values()),
+    })
+
+
+def card_summary(conn):
+    return pd.read_sql_query(
+        f"SELECT * FROM {historical.CARD_SUMMARY_TABLE} ORDER BY card_name_set", conn
+    ).set_index('card_name_set')
+
+
+def new_db(tmp_path):
+    conn = historical.connect(str(tmp_path / 'history.db'))
+    historical.create_schema(conn)
+    return conn
+
+
+def test_reingesting_a_date_with_lower_price_updates_summary(tmp_path):
+    conn = new_db(tmp_path)
+    historical.upsert_daily_prices(conn, '2026-01-01', prices({'A - S - Regular': 10.0, 'B - S - Regular': 3.0}))
+    historical.upsert_daily_prices(conn, '2026-01-02', prices({'A - S - Regular': 20.0, 'B - S - Regular': 4.0}))
+    # Corrected prices for the second day
+    historical.upsert_daily_prices(conn, '2026-01-02', prices({'A - S - Regular': 5.0}))
+
+    summary = card_summary(conn)
+    assert summary.loc['A - S - Regular', ['min_price', 'max_price', 'last_price']].tolist() == [5.0, 10.0, 5.0]
+    assert summary.loc['A - S - Regular', 'last_date'] == '2026-01-02'
+    # B is no longer priced on the second day
+    assert summary.loc['B - S - Regular', ['last_date', 'max_price']].tolist() == ['2026-01-01', 3.0]
+
+    # Same as recomputing everything from scratch
+    historical.rebuild_summaries(conn)
+    pd.testing.assert_frame_equal(card_summary(conn), summary)
+    conn.close()
+
+
+def test_backfilled_day_merges_into_summary(tmp_path):
+    conn = new_db(tmp_path)
+    historical.upsert_daily_prices(conn, '2026-01-02', prices({'A - S - Regular': 10.0}))
+    historical.upsert_daily_prices(conn, '2026-01-03', prices({'A - S - Regular': 12.0}))
+    # An older day only widens the range, the last price stays the newest one
+    historical.upsert_daily_prices(conn, '2026-01-01', prices({'A - S - Regular': 30.0}))
+    summary = card_summary(conn)
+    assert summary.loc['A - S - Regular', ['first_date', 'last_date']].tolist() == ['2026-01-01', '2026-01-03']
+    assert summary.loc['A - S - Regular', ['min_price', 'max_price', 'last_price']].tolist() == [10.0, 30.0, 12.0]
+
+    # Lowering the day that held the max rescans the card
+    historical.upsert_daily_prices(conn, '2026-01-01', prices({'A - S - Regular': 11.0}))
+    assert card_summary(conn).loc['A - S - Regular', 'max_price'] == 12.0
+    historical.rebuild_summaries(conn)
+    assert card_summary(conn).loc['A - S - Regular', 'max_price'] == 12.0
+    conn.close()
+
+
+def test_reingesting_the_same_date_is_idempotent(tmp_path):
+    conn = new_db(tmp_path)
+    day = prices({'A - S - Regular': 10.0})
+    historical.upsert_daily_prices(conn, '2026-01-01', day)
+    first = card_summary(conn)
+    historical.upsert_daily_prices(conn, '2026-01-01', day)
+    pd.testing.assert_frame_equal(card_summary(conn), first)
+    conn.close()
+
+
+def test_rebase_starts_at_first_positive_price():
+    df = pd.DataFrame({
+        'card_name_set': ['A'] * 3 + ['B'] * 2,
+        'efficient_price': [0.0, None, 5.0, 0.0, 0.0],
+    })
+    rebased = historical.rebase_to_100(df)
+    assert [rebased.iloc[0], rebased.iloc[2]] == [0.0, 100.0]
+    assert rebased.iloc[1:2].isna().all()
+    # B was never priced: nothing to rebase on, so it is left out
+    assert historical.has_rebased_values(df, rebased).tolist() == [True, True, True, False, False]
+
+
+def test_portfolio_value_is_continuous_across_compacted_weeks(tmp_path):
+    conn = new_db(tmp_path)
+    # Week of Monday 2026-01-05: A trades every day, B stops on Wednesday
+    for day in pd.date_range('2026-01-05', '2026-01-25').strftime('%Y-%m-%d'):
+        priced = {'A - S - Regular': 20.0}
+        if not '2026-01-08' <= day <= '2026-01-11':
+            priced['B - S - Regular'] = 10.0
+        historical.upsert_daily_prices(conn, day, prices(priced))
+    historical.compact_history(conn, daily_days=7, weekly_days=30)
+
+    holdings = {'A - S - Regular': 1, 'B - S - Regular': 1}
+    df_value = historical.portfolio_value_history(conn, holdings)
+    assert df_value['date'].iloc[0] == pd.Timestamp('2026-01-11')
+    assert df_value['date'].iloc[1] == pd.Timestamp('2026-01-12')
+    assert (df_value['total_value'] == 30.0).all()
+    assert (df_value['cards_priced'] == 2).all()
+    conn.close()
+
+
+def test_old_tier_tables_get_a_period_end(tmp_path):
+    conn = new_db(tmp_path)
+    conn.execute(f"""
+        CREATE TABLE {historical.WEEKLY_TABLE} (
+            card_name_set TEXT NOT NULL, period_start TEXT NOT NULL, first_date TEXT, last_date TEXT,
+            open REAL, high REAL, low REAL, close REAL, avg_price REAL, days INTEGER,
+            PRIMARY KEY (card_name_set, period_start)
+        )
+    """)
+    conn.execute(f"INSERT INTO {historical.WEEKLY_TABLE} VALUES ('A - S - Regular', '2026-01-05', '2026-01-05', '2026-01-07', 1, 1, 1, 1, 1, 3)")
+    historical.upgrade_tier_tables(conn)
+    period_end = conn.execute(f"SELECT period_end FROM {historical.WEEKLY_TABLE}").fetchone()[0]
+    assert period_end == '2026-01-11'
+    conn.close()
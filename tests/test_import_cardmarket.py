@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import import_cardmarket
+import portfolio
+import schema
+import sources
+
+
+EXPORT = """idArticle;idProduct;English Name;Local Name;Exp.;Exp. Name;Price;Language;Condition;Foil?;Signed?;Playset?;Altered?;Comments;Amount;onSale
+1;100;Black Lotus;Black Lotus;LEA;Alpha;12000.00;1;NM;;;;;;1;1
+2;101;Lightning Bolt;Blitz;M10;Magic 2010;1.50;3;ex;X;;;;binder;4;1
+"""
+
+
+def write_sources(directory):
+    (directory / 'stock.csv').write_text(EXPORT, encoding='utf-8')
+    pd.DataFrame({'user': ['alice'], 'mtg_output_file': ['alice.csv']}).to_csv(directory / 'setup.csv', index=False)
+    pd.DataFrame({
+        'card_name': ['Black Lotus', 'Lightning Bolt'],
+        'card_set': ['Alpha', 'Magic 2010'],
+        'rarity': ['Rare', 'Common'],
+    }).to_csv(directory / 'glossary.csv', index=False)
+
+
+def test_imported_export_loads_through_the_local_source(tmp_path):
+    write_sources(tmp_path)
+    result = import_cardmarket.import_export(
+        str(tmp_path / 'stock.csv'), str(tmp_path / 'alice.csv'), str(tmp_path / 'glossary.csv'), date='2026-10-18'
+    )
+    assert result == {'rows': 2, 'unmatched': 0}
+
+    df = portfolio.load_user_data(sources.LocalSheets(str(tmp_path)), sources.SETUP_NAME, 'alice')
+    assert df['card_name_set'].tolist() == ['Black Lotus - Alpha - Regular', 'Lightning Bolt - Magic 2010 - Foil']
+    assert df['amount'].tolist() == [1, 4]
+    assert df['language'].tolist() == ['English', 'German']
+    assert df['condition'].tolist() == ['NM', 'EX']
+    assert df['listed_price'].tolist() == [12000.0, 1.5]
+    assert df['rarity'].tolist() == ['Rare', 'Common']
+    # Left for the pricing job
+    assert df['efficient_price'].isna().all() and df['price_diff_d7'].isna().all()
+    assert set(schema.sheet_columns()) <= set(df.columns)
+
+
+def test_empty_export_gives_a_header_only_file(tmp_path):
+    (tmp_path / 'stock.csv').write_text(EXPORT.splitlines()[0] + '\n', encoding='utf-8')
+    result = import_cardmarket.import_export(str(tmp_path / 'stock.csv'), str(tmp_path / 'alice.csv'))
+    assert result == {'rows': 0, 'unmatched': None}
+    assert pd.read_csv(tmp_path / 'alice.csv').columns.tolist() == schema.sheet_columns()
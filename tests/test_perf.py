@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perf
+
+
+def fragments():
+    @perf.fragment('inner')
+    def inner():
+        with perf.stage('inner.work'):
+            pass
+
+    @perf.fragment('outer')
+    def outer():
+        inner()
+
+    return outer
+
+
+def test_fragment_rerun_starts_its_own_run(monkeypatch):
+    monkeypatch.setattr(perf, '_enabled', True)
+    outer = fragments()
+
+    perf.start_run()
+    with perf.stage('full_run.work'):
+        pass
+    outer()
+    assert {record['run_id'] for record in perf.records()} == {None}
+
+    # Rerun of the outer fragment only: a new run holding the nested fragment too
+    monkeypatch.setattr(perf, '_is_fragment_rerun', lambda: True)
+    outer()
+    stages = [record['stage'] for record in perf.records()]
+    assert stages == ['inner.work', 'fragment.inner', 'fragment.outer']
+    run_ids = {record['run_id'] for record in perf.records()}
+    assert len(run_ids) == 1 and run_ids.pop().startswith('fragment.outer:')
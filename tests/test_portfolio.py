@@ -0,0 +1,87 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import portfolio
+from benchmarks import synthetic
+
+
+class MemorySheets:
+    """Data source serving sheet payloads from a dict"""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+
+    def first_sheet(self, sheet_id):
+        return [list(row) for row in self.sheets[sheet_id]]
+
+
+class CountingSync(portfolio.UserSheetSync):
+    """UserSheetSync recording how many rows each load re-cleaned"""
+
+    def __init__(self):
+        super().__init__()
+        self.cleaned = []
+
+    def clean_rows(self, raw, glossary):
+        self.cleaned.append(len(raw))
+        return super().clean_rows(raw, glossary)
+
+
+def user_sheets(values):
+    return MemorySheets({
+        synthetic.USER_SHEET_ID: values,
+        portfolio.GLOSSARY_SHEET_ID: synthetic.glossary_sheet_values(50),
+    })
+
+
+SETUP_ROW = {'user': 'benchmark', 'mtg_output_file': synthetic.USER_SHEET_ID}
+
+
+def with_date(values, date):
+    date_index = values[0].index('date')
+    return [values[0]] + [row[:date_index] + [date] + row[date_index + 1:] for row in values[1:]]
+
+
+def test_date_only_change_recleans_nothing():
+    values = synthetic.user_sheet_values(50)
+    sync = CountingSync()
+    sync.load(user_sheets(values), 'setup', 'benchmark', SETUP_ROW)
+
+    next_day = with_date(values, '2026-01-02')
+    data = sync.load(user_sheets(next_day), 'setup', 'benchmark', SETUP_ROW)
+
+    assert sync.cleaned == [50]
+    assert (data['date'] == '2026-01-02').all()
+    # Liquidity depends on the date: it must match a full clean of the new sheet
+    expected = portfolio.UserSheetSync().load(user_sheets(next_day), 'setup', 'benchmark', SETUP_ROW)
+    pd.testing.assert_series_equal(data['liquidity'], expected['liquidity'])
+
+
+def test_changed_row_is_recleaned():
+    values = synthetic.user_sheet_values(50)
+    sync = CountingSync()
+    sync.load(user_sheets(values), 'setup', 'benchmark', SETUP_ROW)
+
+    changed = [list(row) for row in values]
+    changed[3][values[0].index('notes')] = 'sold'
+    data = sync.load(user_sheets(changed), 'setup', 'benchmark', SETUP_ROW)
+
+    assert sync.cleaned == [50, 1]
+    assert data['notes'].iloc[2] == 'sold'
+
+
+def test_sync_state_shares_the_returned_frame():
+    values = synthetic.user_sheet_values(50)
+    sync = portfolio.UserSheetSync()
+    data = sync.load(user_sheets(values), 'setup', 'benchmark', SETUP_ROW)
+
+    kept = sync._states['benchmark'].data
+    assert np.shares_memory(kept['efficient_price'].to_numpy(), data['efficient_price'].to_numpy())
+    assert 0 < sync.nbytes('benchmark') < data.memory_usage(deep=True).sum()
+    sync.forget('benchmark')
+    assert sync.nbytes('benchmark') == 0
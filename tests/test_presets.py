@@ -0,0 +1,36 @@
+import logging
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import presets
+
+
+def save_many(path, worker):
+    for i in range(20):
+        presets.save_preset('alice', f"w{worker}-{i}", ['card_name'], path)
+
+
+def test_concurrent_workers_keep_every_preset(tmp_path):
+    path = str(tmp_path / 'presets.json')
+    workers = [multiprocessing.Process(target=save_many, args=(path, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(presets.load_presets('alice', path)) == 80
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_unreadable_file_has_no_presets(tmp_path, caplog):
+    path = tmp_path / 'presets.json'
+    path.write_text('{"alice": {"Prices": ["card_na')
+    with caplog.at_level(logging.WARNING, logger='mindseeker.presets'):
+        assert presets.load_presets('Alice', str(path)) == {}
+    assert 'Unreadable' in caplog.text
+
+    assert presets.save_preset('alice', 'Prices', ['card_name'], str(path)) == {'Prices': ['card_name']}
+    assert presets.load_presets('alice', str(path)) == {'Prices': ['card_name']}
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema
+
+
+# The per-cell cleaning schema.coerce replaced, kept as the reference
+
+def baseline_price(value):
+    if pd.isna(value) or value == 'N/A':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        cleaned = str(value).replace('€', '').replace('£', '').replace('$', '').strip()
+        cleaned = cleaned.replace(',', '.')
+        parts = cleaned.split('.')
+        if len(parts) > 2:
+            cleaned = f"{''.join(parts[:-1])}.{parts[-1]}"
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def baseline_percentage(value):
+    if pd.isna(value) or value in ('N/A', '', 'null'):
+        return None
+    try:
+        cleaned = str(value).strip().replace(',', '.').lower()
+        if '%' in cleaned:
+            return float(cleaned.replace('%', '').strip()) / 100
+        value_float = float(cleaned)
+        if value_float > 1 or value_float < -1:
+            value_float = value_float / 100
+        return value_float
+    except ValueError:
+        return None
+
+
+def baseline_clean(df):
+    df = df.copy()
+    for col in schema.columns_of_kind('price'):
+        if col in df.columns:
+            df[col] = df[col].apply(baseline_price)
+    for col in schema.columns_of_kind('number'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].replace('N/A', pd.NA), errors='coerce')
+    for col in schema.columns_of_kind('text'):
+        if col in df.columns:
+            df[col] = df[col].replace('N/A', None)
+    for col in schema.columns_of_kind('percentage'):
+        if col in df.columns:
+            df[col] = df[col].apply(baseline_percentage)
+    return df
+
+
+CELLS = {
+    'efficient_price': ['1.234,56 €', '1,234.56', '12.5', '€ 3,50', '1.234.567,89', '£7', '$0.99', 'N/A', '', 'abc'],
+    'purchase_price': ['10', '0', '-2,5', '1.000', '7,25 €', '100.000,00', '3.5', 'N/A', '', '12'],
+    'price_diff_d7': ['5%', '5,0 %', '0.05', '5', '-12', '1', '-1', 'N/A', 'null', ''],
+    'price_growth': ['-100%', '250', '0,5', '0', '12.5 %', '-0.3', 'x', 'N/A', '1.5', '99'],
+    'total_stock': ['1', '3', '250', 'N/A', '', '7', '2.5', '0', '10', '4'],
+    'card_name': ['Black Lotus', 'N/A', 'Bolt', '', 'Ancestral Recall', 'N/A', 'Mox', 'Time Walk', 'a', 'b'],
+}
+
+
+@pytest.mark.parametrize('column', sorted(CELLS))
+def test_coerce_matches_the_baseline_cleaning(column):
+    df = pd.DataFrame({column: CELLS[column]})
+    coerced, _ = schema.coerce(df)
+    pd.testing.assert_series_equal(coerced[column], baseline_clean(df)[column])
+
+
+def test_whole_numbers_stay_integers():
+    coerced, _ = schema.coerce(pd.DataFrame({'amount': ['1', '4', '12']}))
+    assert coerced['amount'].dtype == np.int64
+    pd.testing.assert_series_equal(coerced['amount'], baseline_clean(pd.DataFrame({'amount': ['1', '4', '12']}))['amount'])
+
+    coerced, _ = schema.coerce(pd.DataFrame({'amount': ['1', 'N/A']}))
+    assert coerced['amount'].dtype == np.float64
+
+
+def test_parse_price_separators():
+    parsed = schema.parse_price(pd.Series(['1.234,56 €', '1,234.56', '1.234.567,89', '0,99']))
+    assert parsed.tolist() == [1234.56, 1234.56, 1234567.89, 0.99]
+
+
+def test_parse_percentage_scales_numbers_outside_unit_range():
+    parsed = schema.parse_percentage(pd.Series(['0.05', '5', '-12', '5%', '1', '-1']))
+    assert parsed.tolist() == pytest.approx([0.05, 0.05, -0.12, 0.05, 1.0, -1.0])
+
+
+def test_coerce_reports_bad_cells():
+    df = pd.DataFrame({
+        'efficient_price': ['1,5', 'abc', '', 'N/A', '?'],
+        'card_name': ['a', 'b', 'c', 'd', 'e'],
+        'not_in_schema': ['x', 'y', 'z', 'w', 'v'],
+    })
+    coerced, bad_cells = schema.coerce(df)
+    assert bad_cells == {'efficient_price': (2, ['abc', '?'])}
+    assert coerced['not_in_schema'].tolist() == df['not_in_schema'].tolist()
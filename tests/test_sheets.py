@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sheets
+
+
+class GridClient:
+    """gspread client stand-in serving one worksheet, dropping trailing blank rows per range like the API"""
+
+    def __init__(self, values, row_count):
+        self.values = values
+        self.row_count = row_count
+        self.batch_requests = []
+        self.http_client = self
+
+    def fetch_sheet_metadata(self, id, params=None):
+        return {'sheets': [{'properties': {'gridProperties': {'rowCount': self.row_count}}}]}
+
+    def values_batch_get(self, id, ranges, params=None):
+        self.batch_requests.append(list(ranges))
+        value_ranges = []
+        for name in ranges:
+            first, last = (int(row) for row in name.split(':'))
+            rows = [list(row) for row in self.values[first - 1:last]]
+            while rows and not any(rows[-1]):
+                rows.pop()
+            value_ranges.append({'range': name, 'values': rows})
+        return {'valueRanges': value_ranges}
+
+
+def test_first_sheet_reads_every_range_in_one_request():
+    values = [['card_name', 'amount']] + [[f"Card {i}", '1'] for i in range(24)]
+    client = GridClient(values, row_count=1000)
+    gateway = sheets.SheetsGateway(client, batch_rows=10)
+
+    assert gateway.first_sheet('sheet') == values
+    assert len(client.batch_requests) == 1
+    assert client.batch_requests[0][-1] == '991:1000'
+
+
+def test_blank_rows_at_a_range_boundary_keep_the_rest_of_the_sheet():
+    values = [['card_name', 'amount']] + [[f"Card {i}", '1'] for i in range(7)]
+    values += [['', ''], ['', ''], ['', '']] + [['Card late', '2']]
+    client = GridClient(values, row_count=20)
+    gateway = sheets.SheetsGateway(client, batch_rows=10)
+
+    rows = gateway.first_sheet('sheet')
+    assert rows == values
+    assert rows[11] == ['Card late', '2']